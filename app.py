@@ -1,16 +1,38 @@
+import io
 import os
 import re
 import uuid
 import logging
 import urllib.parse
-import requests
 import json
+import copy
+import gzip
+import hashlib
+import socket
 import unicodedata
-from flask import Flask, render_template, request, jsonify, send_file, session, Response, make_response
-import yt_dlp
+from flask import Flask, render_template, request, jsonify, send_file, session, Response, make_response, stream_with_context, g, has_request_context
 import threading
+import subprocess
+import tempfile
 import time
-from datetime import timedelta
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from functools import lru_cache
+from audio_cache import AudioCache
+from transcription_cache import TranscriptionCache
+from job_scheduler import JobScheduler, QueueFullError
+from progress_events import ProgressNotifier
+from job_store import create_job_store
+from artifact_reaper import ExpiryIndex, BackgroundReaper, directory_size
+from http_client import ResilientClient, CircuitBreaker, CircuitOpenError
+from audio_chunking import probe_duration, detect_silences, plan_chunks, split_audio, merge_transcriptions
+from transcript_render import render_transcript_strings, RenderCache, DEFAULT_SEGMENTATION
+from transcript_index import TranscriptIndex, parse_timestamp
+from transcript_search import TranscriptSearchIndex
+from service_lock import ServiceLock
+from metrics import MetricsRegistry, SnapshotPublisher, Gauge, CONTENT_TYPE as METRICS_CONTENT_TYPE
+from job_timing import JobTimer, format_server_timing, create_span_exporter
 
 # Set up logging
 logging.basicConfig(level=logging.DEBUG)
@@ -21,6 +43,32 @@ app = Flask(__name__)
 # Make sure we have a secret key, use default if SESSION_SECRET env var is not available
 app.secret_key = os.environ.get("SESSION_SECRET", "youtube-audio-downloader-secret")
 
+# Static assets are served with versioned URLs (?v=<mtime>), so they can be cached for a year
+STATIC_MAX_AGE_SECONDS = int(os.environ.get('STATIC_MAX_AGE_SECONDS', 365 * 86400))
+app.config['SEND_FILE_MAX_AGE_DEFAULT'] = STATIC_MAX_AGE_SECONDS
+
+# Downloaded audio and rendered transcripts never change under the same URL
+ARTIFACT_MAX_AGE_SECONDS = int(os.environ.get('ARTIFACT_MAX_AGE_SECONDS', 7 * 86400))
+
+# Endpoints that set their own caching headers; every other response is dynamic
+CACHEABLE_ENDPOINTS = {'static', 'get_file', 'get_srt', 'get_vtt', 'get_txt', 'get_json'}
+
+@lru_cache(maxsize=None)
+def static_file_version(filename):
+    """Cache-busting version of a static file (its mtime, read once per process)"""
+    try:
+        return int(os.path.getmtime(os.path.join(app.static_folder, filename)))
+    except OSError:
+        return None
+
+@app.url_defaults
+def version_static_urls(endpoint, values):
+    """Add ?v=<version> to static URLs so a new deploy changes them"""
+    if endpoint == 'static' and 'filename' in values and 'v' not in values:
+        version = static_file_version(values['filename'])
+        if version is not None:
+            values['v'] = version
+
 # Add global middleware to allow framing (embedding in iframes)
 @app.after_request
 def allow_iframe_embedding(response):
@@ -28,68 +76,424 @@ def allow_iframe_embedding(response):
     # Allow the site to be embedded in iframes on any domain
     response.headers['X-Frame-Options'] = 'ALLOWALL'
     response.headers['Content-Security-Policy'] = "frame-ancestors *"
-    # Add cache control headers to prevent certain browser caching issues
+    
+    if request.endpoint in CACHEABLE_ENDPOINTS and response.status_code < 400:
+        if request.endpoint == 'static' and request.args.get('v'):
+            response.cache_control.immutable = True
+        return response
+    
+    # Dynamic responses (pages, progress, errors) must never be cached
     response.headers['Cache-Control'] = 'no-store, no-cache, must-revalidate, post-check=0, pre-check=0, max-age=0'
     response.headers['Pragma'] = 'no-cache'
     response.headers['Expires'] = '-1'
     return response
 
-# Create a directory for temporary files
+# Directory for temporary files (created by create_app)
 TEMP_DIR = "temp_downloads"
-os.makedirs(TEMP_DIR, exist_ok=True)
 
-# Dictionary to store download progress
-download_progress = {}
-download_results = {}
-download_titles = {}
+# Job state lives in a store shared by every gunicorn worker: SQLite (WAL) by default,
+# or a PostgreSQL URL to share across hosts. For a single process, journal:///<path>
+# keeps state in memory backed by an append-only journal, and memory:// keeps nothing.
+# Downloaded files stay on the host that fetched them (results record which), so with
+# several hosts on one store a download's requests must be routed back to that host;
+# each host only expires and evicts its own downloads.
+JOB_STORE_URL = os.environ.get('JOB_STORE_URL', f"sqlite:///{os.path.join(TEMP_DIR, 'jobs.db')}")
+job_store = create_job_store(JOB_STORE_URL)
+
+_worker_ids = {}
+
+def worker_id():
+    """This process's name in the job store: host, pid and a random suffix, since pids get reused"""
+    pid = os.getpid()
+    if pid not in _worker_ids:
+        _worker_ids.setdefault(pid, f"{socket.gethostname()}:{pid}:{uuid.uuid4().hex[:8]}")
+    return _worker_ids[pid]
+
+def is_local_download(result):
+    """Whether a download's files are on this host (results written before hosts were recorded are)"""
+    return result.get('host', socket.gethostname()) == socket.gethostname()
+
+# Dictionary-like views to store download progress
+download_progress = job_store.mapping('progress')
+download_results = job_store.mapping('results')
+download_titles = job_store.mapping('titles')
+download_states = job_store.mapping('states')
+transcription_jobs = job_store.mapping('transcriptions')
+transcription_states = job_store.mapping('transcription_states')
+playlist_jobs = job_store.mapping('playlists')
+video_info = job_store.mapping('video_info')
+mp3_conversions = job_store.mapping('mp3_conversions')
+# When each download was last served; kept apart from its result so refreshing it never
+# writes back a stale copy of a result another request is updating
+download_last_served = job_store.mapping('last_served')
+
+# Prometheus metrics: every worker records into its own registry and publishes a snapshot
+# to the job store, and /metrics sums the snapshots so any worker can answer a scrape
+METRICS_PUBLISH_SECONDS = int(os.environ.get('METRICS_PUBLISH_SECONDS', 10))
+# A worker that hasn't published for this long is gone: only its counters still count, and
+# the reaper fails the jobs it left unfinished
+METRICS_STALE_SECONDS = int(os.environ.get('METRICS_STALE_SECONDS', 120))
+metrics_snapshots = job_store.mapping('metrics')
+metrics = MetricsRegistry()
+http_requests = metrics.counter(
+    'ytt_http_requests_total', 'HTTP responses by endpoint and status code', ('endpoint', 'status')
+)
+http_request_seconds = metrics.histogram(
+    'ytt_http_request_seconds', 'Time to build an HTTP response (streamed bodies not included)', ('endpoint',)
+)
+jobs_finished = metrics.counter('ytt_jobs_finished_total', 'Finished jobs by pipeline and outcome', ('pipeline', 'status'))
+downloaded_bytes = metrics.counter('ytt_downloaded_bytes_total', 'Bytes of media downloaded by yt-dlp')
+job_state_seconds = metrics.histogram(
+    'ytt_job_state_seconds', 'Time jobs spent in each scheduler state (queued, a stage, waiting for a stage)',
+    ('pipeline', 'state')
+)
+api_requests = metrics.counter('ytt_elevenlabs_requests_total', 'ElevenLabs API attempts by status code or error', ('status',))
+api_request_seconds = metrics.histogram('ytt_elevenlabs_request_seconds', 'Latency of ElevenLabs API attempts')
+cache_requests = metrics.counter('ytt_cache_requests_total', 'Cache lookups by cache and result', ('cache', 'result'))
+scheduler_jobs = metrics.gauge('ytt_scheduler_jobs', 'Jobs held by the worker schedulers by state', ('pipeline', 'state'))
+
+def record_cache_lookup(cache, hit):
+    cache_requests.inc(cache=cache, result='hit' if hit else 'miss')
+
+# Where each job's time went, kept with its record; TRACE_EXPORT=jsonl also appends every
+# finished job to TRACE_SPANS_PATH as Zipkin spans, and TRACE_EXPORT=opentelemetry hands
+# them to the OpenTelemetry API. The span file is kept out of temp_downloads (it isn't a
+# download artifact) and rotated to <path>.1 once it reaches TRACE_SPANS_MAX_BYTES.
+job_timer = JobTimer()
+TRACE_EXPORT = os.environ.get('TRACE_EXPORT', '').lower()
+TRACE_SPANS_PATH = os.environ.get('TRACE_SPANS_PATH', os.path.join('traces', 'spans.jsonl'))
+TRACE_SPANS_MAX_BYTES = int(os.environ.get('TRACE_SPANS_MAX_BYTES', 100 * 1024 ** 2))
+span_exporter = create_span_exporter(
+    TRACE_EXPORT, TRACE_SPANS_PATH, 'youtube-transcriber', max_bytes=TRACE_SPANS_MAX_BYTES
+)
+
+def record_job_state_time(pipeline, job_id, state, seconds):
+    """Scheduler callback: a job spent seconds in state"""
+    job_state_seconds.observe(seconds, pipeline=pipeline, state=state)
+    job_timer.record(job_id, state, seconds)
+
+def finish_job_timing(pipeline, job_id):
+    spans = job_timer.finish(job_id)
+    if span_exporter is None:
+        return
+    try:
+        span_exporter.export(pipeline, job_id, spans)
+    except Exception as e:
+        logger.error(f"Error exporting spans of {pipeline} job {job_id}: {str(e)}")
+
+@contextmanager
+def server_timing(name, description=None):
+    """Time the enclosed block into the current response's Server-Timing header"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        if has_request_context():
+            g.setdefault('server_timings', []).append((name, time.perf_counter() - started, description))
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def record_request_metrics(response):
+    endpoint = request.endpoint or 'unmatched'
+    http_requests.inc(endpoint=endpoint, status=response.status_code)
+    if 'request_started' in g:
+        elapsed = time.perf_counter() - g.request_started
+        http_request_seconds.observe(elapsed, endpoint=endpoint)
+        response.headers['Server-Timing'] = format_server_timing(
+            g.get('server_timings', []) + [('total', elapsed, None)]
+        )
+    return response
+
+# Last progress percentage each local download wrote, so the hook only writes on change
+reported_progress = {}
+
+# Shared audio cache so repeat requests for the same video skip yt-dlp entirely
+AUDIO_CACHE_DIR = os.path.join(TEMP_DIR, 'audio_cache')
+audio_cache = AudioCache(AUDIO_CACHE_DIR)
+
+# Keep YouTube's native audio stream (opus/m4a) as downloaded and only encode an MP3
+# when one is explicitly requested. Set AUDIO_PASSTHROUGH=false to always encode MP3.
+AUDIO_PASSTHROUGH = os.environ.get('AUDIO_PASSTHROUGH', 'true').lower() == 'true'
+MP3_QUALITY = '192'
+# Containers the bestaudio/best fallback may download; only their audio track is kept
+VIDEO_EXTENSIONS = ('mp4', 'mkv', 'mov')
+
+# MIME types for the audio containers we may serve or upload
+AUDIO_MIMETYPES = {
+    'mp3': 'audio/mpeg',
+    'm4a': 'audio/mp4',
+    'webm': 'audio/webm',
+    'opus': 'audio/ogg',
+    'ogg': 'audio/ogg',
+    'aac': 'audio/aac',
+}
+
+# Persistent cache of ElevenLabs responses keyed by audio hash and options, kept
+# within its own size bound (least recently used entries go first; 0 disables the bound)
+TRANSCRIPTION_CACHE_DIR = os.path.join(TEMP_DIR, 'transcription_cache')
+TRANSCRIPTION_CACHE_MAX_BYTES = int(os.environ.get('TRANSCRIPTION_CACHE_MAX_BYTES', 1024 ** 3))
+transcription_cache = TranscriptionCache(TRANSCRIPTION_CACHE_DIR, max_bytes=TRANSCRIPTION_CACHE_MAX_BYTES)
+
+# Full-text index over every stored transcript, kept up to date as transcripts come and go.
+# Each worker indexes its own transcriptions as they finish and picks up other workers'
+# every SEARCH_SYNC_SECONDS in the background, so /search only reads the index.
+search_index = TranscriptSearchIndex()
+search_sync_lock = threading.Lock()
+search_sync_thread = None
+search_sync_thread_lock = threading.Lock()
+SEARCH_SYNC_SECONDS = int(os.environ.get('SEARCH_SYNC_SECONDS', 10))
+# Each sync re-reads results written this long before the newest one it has seen
+SEARCH_SYNC_OVERLAP_SECONDS = 60
+search_synced_until = 0.0
+# Transcripts that couldn't be loaded for search, by download ID -> transcript version
+search_unavailable = {}
 
-# Path to save persistent download results
+# Bounded download scheduler: a fixed worker pool plus per-stage concurrency limits
+download_scheduler = JobScheduler(
+    'download',
+    workers=int(os.environ.get('DOWNLOAD_WORKERS', 4)),
+    stage_limits={
+        'extract': int(os.environ.get('DOWNLOAD_EXTRACT_CONCURRENCY', 4)),
+        'download': int(os.environ.get('DOWNLOAD_FETCH_CONCURRENCY', 3)),
+        'postprocess': int(os.environ.get('DOWNLOAD_POSTPROCESS_CONCURRENCY', 2)),
+    },
+    max_queued=int(os.environ.get('DOWNLOAD_MAX_QUEUED', 1000)),
+    on_state_change=lambda download_id, status: publish_download_state(download_id, status),
+    on_state_time=lambda download_id, state, seconds: record_job_state_time('download', download_id, state, seconds)
+)
+
+def publish_download_state(download_id, status):
+    """Share scheduler state, with the job's timings so far, so /progress on any worker can report it"""
+    if status is None:
+        download_states.pop(download_id, None)
+        finish_job_timing('download', download_id)
+    else:
+        download_states[download_id] = {**status, 'owner': worker_id(), 'timings': job_timer.timings(download_id)}
+
+# Playlist and channel ingestion: how many entries to expand, and how far
+# behind single downloads (lower priority values run first) their items queue
+PLAYLIST_MAX_ITEMS = int(os.environ.get('PLAYLIST_MAX_ITEMS', 500))
+PLAYLIST_ITEM_PRIORITY = int(os.environ.get('PLAYLIST_ITEM_PRIORITY', 10))
+# Playlist expansions and items are only admitted while fewer than this many downloads are
+# queued, so a few large playlists can't use up the queue /download needs (DOWNLOAD_MAX_QUEUED)
+PLAYLIST_MAX_QUEUED = int(os.environ.get('PLAYLIST_MAX_QUEUED', 750))
+
+# Transcriptions run as background jobs on their own bounded pool
+transcription_scheduler = JobScheduler(
+    'transcribe',
+    workers=int(os.environ.get('TRANSCRIPTION_WORKERS', 4)),
+    max_queued=int(os.environ.get('TRANSCRIPTION_MAX_QUEUED', 200)),
+    on_state_change=lambda job_id, status: publish_transcription_state(job_id, status),
+    on_state_time=lambda job_id, state, seconds: record_job_state_time('transcription', job_id, state, seconds)
+)
+
+def publish_transcription_state(job_id, status):
+    """Share transcription scheduler state, with the job's timings so far, so any worker can report it"""
+    if status is None:
+        transcription_states.pop(job_id, None)
+        finish_job_timing('transcription', job_id)
+    else:
+        transcription_states[job_id] = {**status, 'owner': worker_id(), 'timings': job_timer.timings(job_id)}
+
+# Wakes SSE progress streams when a download's state changes
+progress_notifier = ProgressNotifier()
+
+# How often an idle progress stream re-checks queue position / sends a keep-alive,
+# and how long one stream may stay open before the browser reconnects
+PROGRESS_STREAM_POLL_SECONDS = 2
+PROGRESS_STREAM_KEEPALIVE_SECONDS = 15
+PROGRESS_STREAM_MAX_SECONDS = 300
+# Minimum gap between two events on one stream; yt-dlp fires its hook many times a second
+PROGRESS_STREAM_MIN_INTERVAL_SECONDS = 0.25
+# Each open stream holds a server thread, so only this many run at once per worker; beyond
+# that the stream is refused with a 503 and the browser falls back to polling /progress
+PROGRESS_STREAM_MAX_CONCURRENT = int(os.environ.get('PROGRESS_STREAM_MAX_CONCURRENT', 4))
+progress_stream_slots = threading.BoundedSemaphore(PROGRESS_STREAM_MAX_CONCURRENT)
+
+# Results file written by older versions; imported into the job store on startup
 DOWNLOAD_RESULTS_PATH = os.path.join(TEMP_DIR, 'download_results.json')
 
-# Load stored download results from disk if it exists
+# Raw ElevenLabs responses are kept out of the job registry in a compressed sidecar per job
+TRANSCRIPTION_DATA_FILENAME = 'transcription.json.gz'
+
+def save_transcription_data(download_id, transcription_data):
+    """Write the raw transcription to the job's sidecar file and return its path"""
+    file_path = os.path.join(TEMP_DIR, download_id, TRANSCRIPTION_DATA_FILENAME)
+    tmp_path = f"{file_path}.tmp"
+    with gzip.open(tmp_path, 'wt', encoding='utf-8') as f:
+        json.dump(transcription_data, f, ensure_ascii=False)
+    os.replace(tmp_path, file_path)
+    return file_path
+
+def load_transcription_data(download_id):
+    """Load the raw transcription for a job, or None if it hasn't been transcribed"""
+    result = download_results.get(download_id)
+    if not result:
+        return None
+    
+    # Results stored before transcripts moved out of line still carry them inline
+    if 'transcription_data' in result:
+        return result['transcription_data']
+    
+    file_path = result.get('transcription_file')
+    if not file_path or not os.path.exists(file_path):
+        return None
+    
+    with gzip.open(file_path, 'rt', encoding='utf-8') as f:
+        return json.load(f)
+
+# Restore the download registry once per deployment (see run_shared_services). The job store
+# is itself the index of every job, so nothing here touches the per-job folders; that happens
+# in the background.
 def load_download_results():
-    global download_results
     try:
         if os.path.exists(DOWNLOAD_RESULTS_PATH):
             with open(DOWNLOAD_RESULTS_PATH, 'r', encoding='utf-8') as f:
                 loaded_results = json.load(f)
-                # Process each download entry
-                for download_id, result in loaded_results.items():
-                    download_dir = f"{TEMP_DIR}/{download_id}"
-                    
-                    # Skip if download directory doesn't exist
-                    if not os.path.exists(download_dir):
-                        logger.debug(f"Skipped restoring missing directory for: {download_id}")
-                        continue
-                    
-                    # Look for MP3 files
-                    mp3_files = [f for f in os.listdir(download_dir) if f.endswith('.mp3')]
-                    if mp3_files:
-                        # Use the actual file we found (first one if multiple)
-                        mp3_file = os.path.join(download_dir, mp3_files[0])
-                        result['file'] = mp3_file
-                        download_results[download_id] = result
-                        logger.debug(f"Restored download result with corrected file path: {download_id} -> {mp3_file}")
-                    elif 'file' in result and os.path.exists(result['file']):
-                        # Fall back to the stored file path if it exists
-                        download_results[download_id] = result
-                        logger.debug(f"Restored download result with original file path: {download_id}")
-                    else:
-                        logger.debug(f"Skipped restoring missing file for: {download_id}")
+            
+            # Fold in results saved by older versions
+            for download_id, result in loaded_results.items():
+                if download_id not in download_results:
+                    download_results[download_id] = result
+            
+            # Durable stores only need the import once
+            if job_store.persistent:
+                os.replace(DOWNLOAD_RESULTS_PATH, f"{DOWNLOAD_RESULTS_PATH}.imported")
+                logger.debug(f"Imported {len(loaded_results)} download results into the job store")
     except Exception as e:
         logger.error(f"Error loading stored download results: {str(e)}")
+    
+    # Check the restored entries against the filesystem without delaying maintenance;
+    # until then, routes already verify files exist when they're first used
+    threading.Thread(target=validate_download_results, daemon=True).start()
 
-# Save download results to disk
-def save_download_results():
-    try:
-        with open(DOWNLOAD_RESULTS_PATH, 'w', encoding='utf-8') as f:
-            json.dump(download_results, f, ensure_ascii=False, indent=4)
-        logger.debug(f"Saved download results to disk: {len(download_results)} entries")
-    except Exception as e:
-        logger.error(f"Error saving download results: {str(e)}")
+def validate_download_result(download_id):
+    """Check one restored download against the filesystem, dropping or repairing it"""
+    result = download_results.get(download_id)
+    # Downloads made on other hosts sharing the store are theirs to check
+    if result is None or not is_local_download(result):
+        return
+    
+    download_dir = f"{TEMP_DIR}/{download_id}"
+    
+    # Skip if download directory doesn't exist
+    if not os.path.exists(download_dir):
+        logger.debug(f"Dropped restored result with missing directory: {download_id}")
+        download_results.pop(download_id, None)
+        return
+    
+    changed = False
+    
+    # Look for MP3 files
+    mp3_files = [f for f in os.listdir(download_dir) if f.endswith('.mp3')]
+    if mp3_files:
+        # Use the actual file we found (first one if multiple)
+        mp3_file = os.path.join(download_dir, mp3_files[0])
+        if result.get('file') != mp3_file:
+            result['file'] = mp3_file
+            changed = True
+            logger.debug(f"Corrected file path of restored result: {download_id} -> {mp3_file}")
+    elif not ('file' in result and os.path.exists(result['file'])):
+        # Neither a local file nor the stored path (e.g. the shared audio cache) exists any more
+        logger.debug(f"Dropped restored result with missing file: {download_id}")
+        download_results.pop(download_id, None)
+        return
+    
+    # Move transcripts stored inline by older versions into their sidecar file
+    if 'transcription_data' in result:
+        result['transcription_file'] = save_transcription_data(download_id, result.pop('transcription_data'))
+        changed = True
+        logger.debug(f"Moved inline transcription data out of line for: {download_id}")
+    
+    if changed:
+        download_results[download_id] = result
+
+def validate_download_results():
+    """Background pass validating every restored download"""
+    started = time.time()
+    download_ids = list(download_results)
+    for download_id in download_ids:
+        try:
+            validate_download_result(download_id)
+        except Exception as e:
+            logger.error(f"Error validating stored download result {download_id}: {str(e)}")
+    logger.debug(f"Validated {len(download_ids)} restored downloads in {time.time() - started:.2f}s")
+    
+    # Index the restored transcripts for search
+    sync_search_index()
+
+def sync_search_index(results=None):
+    """Bring the search index in line with the stored transcripts
+
+    Only results written since the previous sync are read (all of them when
+    ``results`` is passed in), and only transcripts that are new or changed
+    (by version) are loaded, so this is cheap to call often. It picks up
+    transcriptions finished by other workers and drops removed downloads.
+    Transcripts that can't be loaded here (e.g. their file is on another
+    host) aren't retried until their version changes.
+    """
+    global search_synced_until
+    with search_sync_lock:
+        if results is None:
+            # Step back a little: writers' clocks differ and a slow write can land after a later one
+            changed = download_results.items_since(search_synced_until - SEARCH_SYNC_OVERLAP_SECONDS)
+            if changed:
+                search_synced_until = max(search_synced_until, max(updated_at for _, _, updated_at in changed))
+            changed = [(download_id, result) for download_id, result, _ in changed]
+            # Only the IDs are needed to notice removals, which is far cheaper than decoding every result
+            current_ids = set(download_results)
+        else:
+            changed = list(results.items())
+            current_ids = set(results)
+        
+        for download_id, result in changed:
+            if 'transcription_file' not in result and 'transcription_data' not in result:
+                continue
+            version = result.get('transcript_version')
+            if download_id in search_index and search_index.version(download_id) == version:
+                continue
+            if search_unavailable.get(download_id, object()) == version:
+                continue
+            try:
+                transcription_data = load_transcription_data(download_id)
+            except Exception as e:
+                logger.error(f"Error loading transcript {download_id} for search: {str(e)}")
+                transcription_data = None
+            if transcription_data is None:
+                search_unavailable[download_id] = version
+                continue
+            search_unavailable.pop(download_id, None)
+            search_index.add(download_id, transcription_data, version)
+        
+        for download_id in search_index.download_ids():
+            if download_id not in current_ids:
+                search_index.remove(download_id)
+        for download_id in list(search_unavailable):
+            if download_id not in current_ids:
+                del search_unavailable[download_id]
 
-# Load stored results on startup
-load_download_results()
+def run_search_index_sync():
+    """Background loop keeping this worker's search index in line with the job store"""
+    while True:
+        try:
+            sync_search_index()
+        except Exception as e:
+            logger.error(f"Error syncing the search index: {str(e)}")
+        time.sleep(SEARCH_SYNC_SECONDS)
+
+def start_search_index_sync():
+    """Start this worker's sync thread (idempotent, and restarts the thread in a forked child)"""
+    global search_sync_thread
+    with search_sync_thread_lock:
+        if search_sync_thread is not None and search_sync_thread.is_alive():
+            return
+        search_sync_thread = threading.Thread(
+            target=run_search_index_sync, name=f'search-index-sync-{os.getpid()}', daemon=True
+        )
+        search_sync_thread.start()
 
 def is_valid_youtube_url(url):
     """Check if the URL is a valid YouTube URL"""
@@ -119,9 +523,8 @@ def clean_filename(filename):
         # If any error occurs, use a default filename
         return "download_" + str(int(time.time()))
 
-def download_progress_hook(d):
+def download_progress_hook(download_id, d):
     """Callback function to track download progress"""
-    download_id = d.get('info_dict', {}).get('download_id')
     if not download_id:
         return
     
@@ -133,95 +536,317 @@ def download_progress_hook(d):
             progress = float(d['downloaded_bytes']) / float(d['total_bytes_estimate']) * 100
         else:
             progress = 0
-            
-        download_progress[download_id] = progress
     elif d['status'] == 'finished':
-        download_progress[download_id] = 100
+        progress = 100
+        downloaded_bytes.inc(d.get('total_bytes') or d.get('downloaded_bytes') or 0)
+    else:
+        return
+    
+    # The hook fires many times a second; only write to the shared store when the whole percentage moves
+    if int(progress) == reported_progress.get(download_id):
+        return
+    reported_progress[download_id] = int(progress)
+    download_progress[download_id] = progress
+    
+    # Push the update to any open progress streams
+    progress_notifier.notify(download_id)
 
-def download_audio(youtube_url, download_id):
-    """Download audio from YouTube video"""
+def mp3_path(source_file):
+    """Where the MP3 conversion of an audio file is (or would be) stored"""
+    if source_file.endswith('.mp3'):
+        return source_file
+    return os.path.splitext(source_file)[0] + '.mp3'
+
+def convert_to_mp3(source_file, job_id=None, on_progress=None):
+    """Encode an audio file to MP3 next to it, reusing an earlier conversion
+
+    Callers converting a cached file must hold audio_cache.fill_lock for its video.
+    ``on_progress(percent)`` is called as ffmpeg works through the file.
+    """
+    mp3_file = mp3_path(source_file)
+    if os.path.exists(mp3_file) and os.path.getsize(mp3_file) > 0:
+        return mp3_file
+    
+    tmp_file = f"{mp3_file}.part"
+    # Counts against the same ffmpeg limit as download postprocessing
+    with download_scheduler.stage(job_id, 'postprocess'):
+        run_ffmpeg(
+            ['-i', source_file, '-vn', '-codec:a', 'libmp3lame', '-b:a', f'{MP3_QUALITY}k', '-f', 'mp3', tmp_file],
+            source_file, on_progress
+        )
+    os.replace(tmp_file, mp3_file)
+    logger.debug(f"Converted {source_file} to MP3: {mp3_file}")
+    return mp3_file
+
+def extract_audio(video_file, job_id=None):
+    """Replace a downloaded video with its audio track: copied into M4A if it fits, else encoded to MP3
+
+    Callers must hold audio_cache.fill_lock for the video.
+    """
+    m4a_file = os.path.splitext(video_file)[0] + '.m4a'
+    tmp_file = f"{m4a_file}.part"
     try:
-        # Set options for yt-dlp
-        ydl_opts = {
-            'format': 'bestaudio/best',
-            'postprocessors': [{
-                'key': 'FFmpegExtractAudio',
-                'preferredcodec': 'mp3',
-                'preferredquality': '192',
-            }],
-            'outtmpl': f'{TEMP_DIR}/{download_id}/%(title)s.%(ext)s',
-            'progress_hooks': [download_progress_hook],
-            'quiet': True,
-        }
-        
-        # Add download_id to info_dict for tracking progress
-        class MyLogger(object):
-            def debug(self, msg):
-                pass
+        with download_scheduler.stage(job_id, 'postprocess'):
+            run_ffmpeg(['-i', video_file, '-vn', '-codec:a', 'copy', '-f', 'ipod', tmp_file], video_file)
+        os.replace(tmp_file, m4a_file)
+        audio_file = m4a_file
+    except subprocess.CalledProcessError as e:
+        # The audio codec doesn't go in an M4A (e.g. Opus in MKV); encode it instead
+        logger.debug(f"Could not copy the audio of {video_file} into M4A, encoding MP3: {e.stderr}")
+        if os.path.exists(tmp_file):
+            os.remove(tmp_file)
+        audio_file = convert_to_mp3(video_file, job_id)
+    os.remove(video_file)
+    logger.debug(f"Extracted audio from {video_file}: {audio_file}")
+    return audio_file
+
+def run_ffmpeg(args, source_file, on_progress=None):
+    """Run ffmpeg on source_file, reporting progress through on_progress(percent) if given"""
+    command = ['ffmpeg', '-y', '-loglevel', 'error'] + args
+    if on_progress is None:
+        subprocess.run(command, check=True, capture_output=True)
+        return
+    
+    try:
+        duration = probe_duration(source_file)
+    except Exception as e:
+        logger.warning(f"Could not read the duration of {source_file}, not reporting progress: {str(e)}")
+        duration = 0
+    
+    # -progress writes key=value lines to stdout; out_time_us is the position reached so far
+    command[1:1] = ['-nostats', '-progress', 'pipe:1']
+    with tempfile.TemporaryFile() as stderr:
+        process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=stderr, text=True)
+        for line in process.stdout:
+            key, _, value = line.strip().partition('=')
+            if key in ('out_time_us', 'out_time_ms') and duration > 0 and value.isdigit():
+                on_progress(min(99.0, int(value) / 1e6 / duration * 100))
+        if process.wait() != 0:
+            stderr.seek(0)
+            raise subprocess.CalledProcessError(process.returncode, command, stderr=stderr.read())
+
+# Extraction options shared by /info and downloads, so a preflight's format
+# selection is exactly what the download would have picked
+INFO_YDL_OPTS = {
+    'format': 'bestaudio/best',
+    # Only the first entry of a playlist is ever used
+    'playlist_items': '1',
+    'quiet': True,
+    'no_warnings': True,
+}
+
+# Warm, reusable downloaders: building a YoutubeDL and its extractors is paid once per
+# instance, and the job an instance works for is set when it is checked out
+YDL_POOL_SIZE = int(os.environ.get('YDL_POOL_SIZE', download_scheduler.workers + 4))
+_ydl_pool = None
+_ydl_pool_lock = threading.Lock()
+
+def get_ydl_pool():
+    """The downloader pool, created on first use so yt_dlp isn't imported while a worker boots"""
+    global _ydl_pool
+    with _ydl_pool_lock:
+        if _ydl_pool is None:
+            from ydl_pool import YoutubeDLPool, QuietYDLLogger, StageLimitedExtractAudioPP
             
-            def warning(self, msg):
-                pass
+            def setup_pooled_downloader(ydl):
+                if not AUDIO_PASSTHROUGH:
+                    # Convert to MP3, limited separately so ffmpeg processes stay bounded
+                    ydl.add_post_processor(
+                        StageLimitedExtractAudioPP(
+                            ydl, download_scheduler, preferredcodec='mp3', preferredquality=MP3_QUALITY
+                        ),
+                        when='post_process'
+                    )
             
-            def error(self, msg):
-                logger.error(msg)
+            _ydl_pool = YoutubeDLPool(
+                {
+                    **INFO_YDL_OPTS,
+                    'logger': QuietYDLLogger(),
+                    # Audio is written once per video into the shared cache
+                    'outtmpl': audio_cache.output_template(),
+                },
+                size=YDL_POOL_SIZE,
+                progress_callback=download_progress_hook,
+                setup=setup_pooled_downloader
+            )
+        return _ydl_pool
+
+# Stream URLs in extracted info are signed and expire after a few hours
+VIDEO_INFO_TTL_SECONDS = int(os.environ.get('VIDEO_INFO_TTL_SECONDS', 1800))
+
+# Bulky fields a download never needs; dropped before the info is stored
+VIDEO_INFO_DROPPED_FIELDS = ('automatic_captions', 'subtitles', 'thumbnails', 'heatmap', 'chapters')
+
+# Per-URL extraction locks, [lock, holders]; an entry is dropped when its last holder leaves
+video_info_locks = {}
+video_info_locks_lock = threading.Lock()
+
+def video_info_key(url):
+    return hashlib.sha256(url.strip().encode('utf-8')).hexdigest()[:32]
+
+@contextmanager
+def video_info_lock(key):
+    with video_info_locks_lock:
+        entry = video_info_locks.setdefault(key, [threading.Lock(), 0])
+        entry[1] += 1
+    try:
+        with entry[0]:
+            yield
+    finally:
+        with video_info_locks_lock:
+            entry[1] -= 1
+            if entry[1] == 0:
+                del video_info_locks[key]
+
+def cached_video_info(key):
+    cached = video_info.get(key)
+    if cached and cached['expires_at'] > time.time():
+        return cached['info']
+    return None
+
+def get_video_info(url, ydl=None):
+    """Extracted info for a video URL (first entry of a playlist), cached in the job store for a TTL
+
+    Concurrent requests for the same URL in this process share one extraction.
+    """
+    key = video_info_key(url)
+    info = cached_video_info(key)
+    if info is not None:
+        record_cache_lookup('video_info', True)
+        logger.debug(f"Video info cache hit for {url}")
+        return info
+    
+    if ydl is None:
+        # Take the pool slot before the URL lock, as downloads do, so the two can't deadlock
+        with get_ydl_pool().job(None) as info_ydl:
+            return get_video_info(url, info_ydl)
+    
+    with video_info_lock(key):
+        # Another request may have extracted it while we waited
+        info = cached_video_info(key)
+        record_cache_lookup('video_info', info is not None)
+        if info is not None:
+            return info
         
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            # Before download, add custom field to info_dict
-            orig_extract_info = ydl.extract_info
-            
-            def custom_extract_info(url, *args, **kwargs):
-                info = orig_extract_info(url, *args, **kwargs)
-                if info:
-                    info['download_id'] = download_id
-                    # Store the title for later use
-                    if 'title' in info:
-                        download_titles[download_id] = info['title']
-                return info
-            
-            ydl.extract_info = custom_extract_info
-            ydl.logger = MyLogger()
-            
-            # Start the download
-            info = ydl.extract_info(youtube_url, download=True)
+        info = extract_video_info(ydl, url)
+        video_info[key] = {'info': info, 'expires_at': time.time() + VIDEO_INFO_TTL_SECONDS}
+        return info
+
+def extract_video_info(ydl, url):
+    """Run extraction without downloading and reduce the result to a storable video info dict"""
+    info = ydl.extract_info(url, download=False)
+    
+    if 'entries' in info:  # It's a playlist
+        info = next(iter(info['entries']))  # Get the first video
+    
+    info = ydl.sanitize_info(info)
+    for field in VIDEO_INFO_DROPPED_FIELDS:
+        info.pop(field, None)
+    return info
+
+@app.route('/info')
+def get_info():
+    """Title, duration and thumbnail of a video before it is downloaded"""
+    youtube_url = request.args.get('url', '')
+    
+    if not is_valid_youtube_url(youtube_url):
+        return jsonify({
+            'status': 'error',
+            'message': 'Invalid YouTube URL'
+        }), 400
+    
+    try:
+        with server_timing('info', 'video metadata'):
+            info = get_video_info(youtube_url)
+    except Exception as e:
+        logger.error(f"Error extracting video info: {str(e)}")
+        return jsonify({
+            'status': 'error',
+            'message': 'Could not read this video'
+        }), 400
+    
+    return jsonify({
+        'status': 'success',
+        'video_id': info.get('id'),
+        'title': info.get('title'),
+        'duration': info.get('duration'),
+        'uploader': info.get('uploader'),
+        'thumbnail': info.get('thumbnail'),
+        'is_live': info.get('is_live', False)
+    })
+
+def download_audio(youtube_url, download_id):
+    """Download audio from YouTube video"""
+    try:
+        with get_ydl_pool().job(download_id) as ydl:
+            # Resolve the canonical video ID before downloading anything, reusing
+            # the metadata a preflight /info request already extracted
+            with download_scheduler.stage(download_id, 'extract'):
+                # Downloading fills in the dict, so work on a copy of the cached one
+                info = copy.deepcopy(get_video_info(youtube_url, ydl))
             
-            # Get the output file path
-            if 'entries' in info:  # It's a playlist
-                info = info['entries'][0]  # Get the first video
+            if 'title' in info:
+                download_titles[download_id] = info['title']
             
+            video_id = info['id']
             title = download_titles.get(download_id, "download")
             
-            # Look for the actual file in the download directory
-            download_dir = f"{TEMP_DIR}/{download_id}"
-            mp3_files = [f for f in os.listdir(download_dir) if f.endswith('.mp3')]
-            
-            if mp3_files:
-                # Use the actual filename found
-                mp3_file = os.path.join(download_dir, mp3_files[0])
-                logger.debug(f"Found MP3 file: {mp3_file}")
-            else:
-                # Fallback if no file found (shouldn't happen)
-                mp3_file = f"{download_dir}/{clean_filename(title)}.mp3"
-                logger.warning(f"No MP3 file found in {download_dir}, using fallback: {mp3_file}")
-            
-            # Set the result
-            download_results[download_id] = {
-                'status': 'success',
-                'file': mp3_file,
-                'title': title
-            }
+            # Hold the per-video lock so concurrent requests for the same video share one download
+            with audio_cache.fill_lock(video_id):
+                audio_file = audio_cache.lookup(video_id)
+                record_cache_lookup('audio', audio_file is not None)
+                
+                if audio_file:
+                    logger.debug(f"Audio cache hit for {video_id}: {audio_file}")
+                else:
+                    logger.debug(f"Audio cache miss for {video_id}, downloading")
+                    with download_scheduler.stage(download_id, 'download'):
+                        ydl.process_ie_result(info, download=True)
+                    audio_file = audio_cache.lookup(video_id)
+                    
+                    # Without an audio-only format, bestaudio/best falls back to a whole video
+                    video_file = None if audio_file else audio_cache.lookup(video_id, VIDEO_EXTENSIONS)
+                    if video_file:
+                        audio_file = extract_audio(video_file, download_id)
+                    
+                    if not audio_file:
+                        raise Exception(f"No audio file found in {audio_cache.entry_dir(video_id)} after download")
+                    logger.debug(f"Found audio file: {audio_file}")
+                
+                # A native file cached earlier still has to be encoded when MP3 is always wanted
+                if not AUDIO_PASSTHROUGH:
+                    audio_file = convert_to_mp3(audio_file, download_id)
+                
+                # Record the result while still holding the lock, then mark the entry used:
+                # a reaper pass that read the results before this write won't evict it
+                download_results[download_id] = {
+                    'status': 'success',
+                    'file': audio_file,
+                    'title': title,
+                    'video_id': video_id,
+                    'host': socket.gethostname(),
+                    'completed_at': time.time(),
+                    'timings': job_timer.timings(download_id)
+                }
+                audio_cache.touch(video_id)
             
-            # Save updated download results to disk
-            save_download_results()
+            download_progress[download_id] = 100
+            jobs_finished.inc(pipeline='download', status='success')
             
     except Exception as e:
         logger.error(f"Error downloading audio: {str(e)}")
         download_results[download_id] = {
             'status': 'error',
-            'error': str(e)
+            'error': str(e),
+            'host': socket.gethostname(),
+            'completed_at': time.time(),
+            'timings': job_timer.timings(download_id)
         }
-        
-        # Save updated download results to disk even in case of error
-        save_download_results()
+        jobs_finished.inc(pipeline='download', status='error')
+    finally:
+        reported_progress.pop(download_id, None)
+        progress_notifier.notify(download_id)
+        download_expiry.set(download_id, time.time() + DOWNLOAD_TTL_SECONDS)
 
 @app.route('/')
 def index():
@@ -239,6 +864,13 @@ def download():
             'message': 'Invalid YouTube URL'
         }), 400
     
+    # Lower values run first; jobs with the same priority run in arrival order. Clients may
+    # defer their own downloads, but nothing jumps ahead of ordinary /download requests.
+    try:
+        priority = max(0, int(request.form.get('priority', 0)))
+    except ValueError:
+        priority = 0
+    
     # Generate a unique download ID
     download_id = str(uuid.uuid4())
     
@@ -248,42 +880,314 @@ def download():
     # Initialize progress tracking
     download_progress[download_id] = 0
     
-    # Start download in background thread
-    threading.Thread(
-        target=download_audio,
-        args=(youtube_url, download_id),
-        daemon=True
-    ).start()
+    # Queue the download on the bounded worker pool
+    try:
+        download_scheduler.submit(download_id, download_audio, youtube_url, download_id, priority=priority)
+    except QueueFullError as e:
+        logger.warning(str(e))
+        download_progress.pop(download_id, None)
+        os.rmdir(f"{TEMP_DIR}/{download_id}")
+        return jsonify({
+            'status': 'error',
+            'message': 'The server is busy, please try again in a few minutes'
+        }), 503
     
     return jsonify({
         'status': 'started',
-        'download_id': download_id
+        'download_id': download_id,
+        'queue_position': (download_scheduler.status(download_id) or {}).get('queue_position')
     })
 
-@app.route('/progress/<download_id>')
-def progress(download_id):
-    """Get the progress of a download"""
+@app.route('/download_playlist', methods=['POST'])
+def download_playlist():
+    """Start downloading every video of a playlist or channel"""
+    playlist_url = request.form.get('youtube_url', '')
+    
+    if not is_valid_youtube_url(playlist_url):
+        return jsonify({
+            'status': 'error',
+            'message': 'Invalid YouTube URL'
+        }), 400
+    
+    # Playlists can be queued further back, never ahead of single downloads
+    try:
+        priority = max(PLAYLIST_ITEM_PRIORITY, int(request.form.get('priority', PLAYLIST_ITEM_PRIORITY)))
+    except ValueError:
+        priority = PLAYLIST_ITEM_PRIORITY
+    
+    # The parent job only tracks its items; each video gets its own download job
+    playlist_id = str(uuid.uuid4())
+    playlist_jobs[playlist_id] = {
+        'status': 'expanding',
+        'url': playlist_url,
+        'items': [],
+        'owner': worker_id(),
+        'created_at': time.time()
+    }
+    
+    # Expanding the entries needs a network round trip, so it runs on the download pool too
+    try:
+        download_scheduler.submit(
+            playlist_id, expand_playlist, playlist_url, playlist_id, priority,
+            priority=priority, max_queued=PLAYLIST_MAX_QUEUED
+        )
+    except QueueFullError as e:
+        logger.warning(str(e))
+        playlist_jobs.pop(playlist_id, None)
+        return jsonify({
+            'status': 'error',
+            'message': 'The server is busy, please try again in a few minutes'
+        }), 503
+    
+    return jsonify({
+        'status': 'started',
+        'playlist_id': playlist_id
+    })
+
+def iter_playlist_entries(ydl, info, depth=1):
+    """Yield the flat video entries of a playlist, descending into channel tabs"""
+    for entry in info.get('entries') or []:
+        if not entry:
+            continue
+        # A channel URL expands to its tabs (Videos, Shorts, Live), each a playlist itself
+        if entry.get('ie_key') == 'YoutubeTab' or entry.get('_type') == 'playlist':
+            if depth <= 0:
+                continue
+            if entry.get('_type') != 'playlist':
+                entry = ydl.extract_info(entry['url'], download=False)
+            yield from iter_playlist_entries(ydl, entry, depth - 1)
+        else:
+            yield entry
+
+def expand_playlist(playlist_url, playlist_id, priority):
+    """Expand a playlist with flat extraction and queue one download job per video"""
+    import yt_dlp
+    
+    playlist = playlist_jobs.get(playlist_id) or {'url': playlist_url, 'created_at': time.time()}
+    
+    try:
+        ydl_opts = {
+            # Only list the entries; each video is resolved by its own job
+            'extract_flat': 'in_playlist',
+            'playlistend': PLAYLIST_MAX_ITEMS,
+            'quiet': True,
+            'no_warnings': True,
+        }
+        
+        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+            with download_scheduler.stage(playlist_id, 'extract'):
+                info = ydl.extract_info(playlist_url, download=False)
+                entries = list(iter_playlist_entries(ydl, info))[:PLAYLIST_MAX_ITEMS]
+        
+        if 'entries' not in info:
+            # A single video URL is a playlist of one
+            entries = [info]
+        
+        playlist['title'] = info.get('title', 'playlist')
+        items = []
+        
+        for entry in entries:
+            video_url = entry.get('webpage_url') or entry.get('url')
+            if not video_url:
+                continue
+            if not video_url.startswith('http'):
+                video_url = f"https://www.youtube.com/watch?v={video_url}"
+            
+            download_id = str(uuid.uuid4())
+            os.makedirs(f"{TEMP_DIR}/{download_id}", exist_ok=True)
+            download_progress[download_id] = 0
+            if entry.get('title'):
+                download_titles[download_id] = entry['title']
+            
+            try:
+                download_scheduler.submit(
+                    download_id, download_audio, video_url, download_id,
+                    priority=priority, max_queued=PLAYLIST_MAX_QUEUED
+                )
+            except QueueFullError as e:
+                download_results[download_id] = {
+                    'status': 'error',
+                    'error': str(e),
+                    'host': socket.gethostname(),
+                    'completed_at': time.time()
+                }
+            items.append(download_id)
+        
+        playlist['items'] = items
+        playlist['status'] = 'running'
+        logger.debug(f"Playlist {playlist_id} expanded into {len(items)} downloads")
+    except Exception as e:
+        logger.error(f"Error expanding playlist: {str(e)}")
+        playlist['status'] = 'error'
+        playlist['error'] = str(e)
+    finally:
+        playlist_jobs[playlist_id] = playlist
+
+@app.route('/playlist_progress/<playlist_id>')
+def playlist_progress(playlist_id):
+    """Get the aggregate progress of a playlist and the state of each of its downloads"""
+    playlist = playlist_jobs.get(playlist_id)
+    if playlist is None:
+        return jsonify({
+            'status': 'error',
+            'message': 'Playlist not found'
+        }), 404
+    
+    if playlist['status'] == 'error':
+        return jsonify({
+            'status': 'error',
+            'finished': True,
+            'message': playlist.get('error', 'Unknown error')
+        })
+    
+    if playlist['status'] == 'expanding':
+        job_status = download_scheduler.status(playlist_id) or download_states.get(playlist_id) or {}
+        return jsonify({
+            'status': 'expanding',
+            'finished': False,
+            'progress': 0,
+            'state': job_status.get('state', 'running'),
+            'queue_position': job_status.get('queue_position')
+        })
+    
+    items = []
+    counts = Counter()
+    for download_id in playlist['items']:
+        payload = get_progress_payload(download_id)
+        items.append({
+            'download_id': download_id,
+            'title': download_titles.get(download_id) or payload.get('title'),
+            'status': payload['status'],
+            'progress': payload['progress'],
+            'finished': payload['finished'],
+            'message': payload.get('message', '')
+        })
+        counts[payload['status']] += 1
+    
+    total = len(items)
+    finished = counts['success'] + counts['error']
+    return jsonify({
+        'status': 'success' if finished == total else 'downloading',
+        'finished': finished == total,
+        'title': playlist.get('title', 'playlist'),
+        'progress': round(sum(item['progress'] for item in items) / total) if total else 100,
+        'total': total,
+        'completed': counts['success'],
+        'failed': counts['error'],
+        'items': items
+    })
+
+def get_progress_payload(download_id):
+    """Build the progress report shared by /progress and its event stream"""
     progress = download_progress.get(download_id, 0)
     
     if download_id in download_results:
         result = download_results[download_id]
-        return jsonify({
+        return {
             'status': result['status'],
             'progress': 100,
             'finished': True,
             'title': result.get('title', 'download'),
-            'message': result.get('error', '')
-        })
+            'message': result.get('error', ''),
+            'timings': result.get('timings', {})
+        }
     
-    return jsonify({
+    # Scheduler state: queued (with position), waiting for a stage slot, or in a stage.
+    # Jobs queued on another worker process are reported from the shared store.
+    job_status = download_scheduler.status(download_id) or download_states.get(download_id) or {}
+    
+    return {
         'status': 'downloading',
         'progress': progress,
-        'finished': False
-    })
+        'finished': False,
+        'state': job_status.get('state', 'running'),
+        'queue_position': job_status.get('queue_position'),
+        'timings': job_timer.timings(download_id) or job_status.get('timings', {})
+    }
+
+def download_exists(download_id):
+    """Whether a download is queued, running or finished (and not yet cleaned up) anywhere"""
+    return (
+        download_id in download_results
+        or download_id in download_progress
+        or download_id in download_states
+        or download_scheduler.status(download_id) is not None
+    )
+
+@app.route('/progress/<download_id>')
+def progress(download_id):
+    """Get the progress of a download"""
+    return jsonify(get_progress_payload(download_id))
+
+@app.route('/progress/<download_id>/stream')
+def progress_stream(download_id):
+    """Push progress updates for a download as Server-Sent Events"""
+    # An unknown or cleaned-up download would never finish and hold a stream slot for nothing
+    if not download_exists(download_id):
+        return jsonify({
+            'status': 'error',
+            'message': 'Download not found'
+        }), 404
+    
+    if not progress_stream_slots.acquire(blocking=False):
+        return jsonify({
+            'status': 'error',
+            'message': 'Too many progress streams open, poll /progress instead'
+        }), 503
+    
+    def generate():
+        started = time.time()
+        last_sent = None
+        last_event_time = 0
+        version = progress_notifier.version(download_id)
+        
+        # Tell the browser how long to wait before reconnecting
+        yield "retry: 2000\n\n"
+        
+        while True:
+            payload = get_progress_payload(download_id)
+            message = json.dumps(payload)
+            
+            if message != last_sent:
+                yield f"data: {message}\n\n"
+                last_sent = message
+                last_event_time = time.time()
+            elif time.time() - last_event_time >= PROGRESS_STREAM_KEEPALIVE_SECONDS:
+                # SSE comment line keeps proxies from closing an idle connection
+                yield ": keep-alive\n\n"
+                last_event_time = time.time()
+            
+            if payload['finished']:
+                yield "event: finished\ndata: {}\n\n"
+                return
+            
+            # Cleaned up or expired while we watched; the reconnect gets a 404 and gives up
+            if not download_exists(download_id):
+                return
+            
+            # Cap the stream lifetime so a worker isn't pinned forever; EventSource reconnects
+            if time.time() - started > PROGRESS_STREAM_MAX_SECONDS:
+                return
+            
+            # Coalesce bursts of hook events into one update
+            since_last = time.time() - last_event_time
+            if since_last < PROGRESS_STREAM_MIN_INTERVAL_SECONDS:
+                time.sleep(PROGRESS_STREAM_MIN_INTERVAL_SECONDS - since_last)
+            
+            version = progress_notifier.wait(download_id, version, PROGRESS_STREAM_POLL_SECONDS)
+    
+    response = Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'X-Accel-Buffering': 'no'}
+    )
+    # Runs when the stream ends or the client goes away, whether or not it was ever iterated
+    response.call_on_close(progress_stream_slots.release)
+    return response
 
 @app.route('/get_file/<download_id>')
 def get_file(download_id):
-    """Send the downloaded file to the user"""
+    """Send the downloaded file to the user, as an MP3 if ?format=mp3 is given"""
     if download_id not in download_results:
         return jsonify({
             'status': 'error',
@@ -309,36 +1213,177 @@ def get_file(download_id):
             'message': 'Audio file not found on the server. It may have been deleted.'
         }), 404
     
+    # MP3s are encoded by a background job (POST /convert) and only served from here
+    if request.args.get('format') == 'mp3':
+        file_path = mp3_path(file_path)
+        if not os.path.exists(file_path) or os.path.getsize(file_path) == 0:
+            return jsonify({
+                'status': 'error',
+                'message': 'The MP3 is not ready yet, start the conversion first'
+            }), 409
+    
+    extension = os.path.splitext(file_path)[1].lstrip('.').lower()
+    
+    # Serving a file pushes back its expiry
+    touch_download(download_id, result)
+    
+    # Cached audio is content-addressed by video ID, so the tag holds across workers
+    etag = f"{result['video_id']}.{extension}-{os.path.getsize(file_path)}" if result.get('video_id') else True
+    
     # Send the file
-    return send_file(
+    return send_artifact(
         file_path,
-        as_attachment=True,
-        download_name=f"{clean_filename(title)}.mp3",
-        mimetype="audio/mpeg"
+        f"{clean_filename(title)}.{extension}",
+        AUDIO_MIMETYPES.get(extension, 'application/octet-stream'),
+        etag=etag
     )
 
-@app.route('/cleanup', methods=['POST'])
-def cleanup():
-    """Clean up temporary files after download"""
-    download_id = request.form.get('download_id')
-    
-    if download_id and download_id in download_results:
+@app.route('/convert/<download_id>', methods=['POST'])
+def convert(download_id):
+    """Start encoding a download to MP3 in the background; poll /conversion_progress for the result"""
+    result = download_results.get(download_id)
+    if result is None:
+        return jsonify({
+            'status': 'error',
+            'message': 'Download not found'
+        }), 404
+    
+    if result['status'] != 'success':
+        return jsonify({
+            'status': 'error',
+            'message': result.get('error', 'Unknown error')
+        }), 400
+    
+    # Already converted, or a conversion is on its way
+    conversion = mp3_conversions.get(download_id)
+    mp3_file = mp3_path(result['file'])
+    if os.path.exists(mp3_file) and os.path.getsize(mp3_file) > 0:
+        return jsonify({'status': 'success', 'finished': True, 'progress': 100})
+    if conversion and conversion['status'] in ('queued', 'running'):
+        return jsonify(get_conversion_payload(download_id, conversion))
+    
+    mp3_conversions[download_id] = {
+        'status': 'queued',
+        'progress': 0,
+        'owner': worker_id(),
+        'created_at': time.time()
+    }
+    
+    # Encoding competes with downloads for the same ffmpeg slots, so it runs on the download pool
+    job_id = conversion_job_id(download_id)
+    try:
+        download_scheduler.submit(job_id, run_mp3_conversion, download_id)
+    except QueueFullError as e:
+        logger.warning(str(e))
+        mp3_conversions.pop(download_id, None)
+        return jsonify({
+            'status': 'error',
+            'message': 'The server is busy, please try again in a few minutes'
+        }), 503
+    
+    return jsonify({
+        'status': 'started',
+        'queue_position': (download_scheduler.status(job_id) or {}).get('queue_position')
+    })
+
+def conversion_job_id(download_id):
+    return f"mp3:{download_id}"
+
+def run_mp3_conversion(download_id):
+    """Background job: encode a download's audio to MP3 next to it, recording progress"""
+    job_id = conversion_job_id(download_id)
+    conversion = mp3_conversions.get(download_id) or {'created_at': time.time()}
+    conversion['status'] = 'running'
+    mp3_conversions[download_id] = conversion
+    
+    def on_progress(percent):
+        # ffmpeg reports several times a second; only write when the whole percentage moves
+        if int(percent) != conversion.get('progress'):
+            conversion['progress'] = int(percent)
+            mp3_conversions[download_id] = conversion
+    
+    try:
+        result = download_results.get(download_id)
+        if result is None:
+            raise Exception('The download was removed before it could be converted')
+        
+        if result.get('video_id'):
+            with audio_cache.fill_lock(result['video_id']):
+                convert_to_mp3(result['file'], job_id, on_progress)
+        else:
+            convert_to_mp3(result['file'], job_id, on_progress)
+        conversion.update({'status': 'success', 'progress': 100})
+    except Exception as e:
+        logger.error(f"Error converting {download_id} to MP3: {str(e)}")
+        conversion.update({'status': 'error', 'message': 'Could not convert the audio to MP3'})
+    
+    conversion['completed_at'] = time.time()
+    mp3_conversions[download_id] = conversion
+    jobs_finished.inc(pipeline='mp3_conversion', status=conversion['status'])
+
+def get_conversion_payload(download_id, conversion):
+    """Progress report for an MP3 conversion"""
+    if conversion['status'] == 'error':
+        return {'status': 'error', 'finished': True, 'message': conversion.get('message', 'Unknown error')}
+    if conversion['status'] == 'success':
+        return {'status': 'success', 'finished': True, 'progress': 100}
+    
+    job_id = conversion_job_id(download_id)
+    job_status = download_scheduler.status(job_id) or download_states.get(job_id) or {}
+    return {
+        'status': 'converting',
+        'finished': False,
+        'progress': conversion.get('progress', 0),
+        'state': job_status.get('state', conversion['status']),
+        'queue_position': job_status.get('queue_position')
+    }
+
+@app.route('/conversion_progress/<download_id>')
+def conversion_progress(download_id):
+    """Get the progress of a download's MP3 conversion"""
+    conversion = mp3_conversions.get(download_id)
+    if conversion is None:
+        return jsonify({
+            'status': 'error',
+            'message': 'Conversion not found'
+        }), 404
+    return jsonify(get_conversion_payload(download_id, conversion))
+
+def send_artifact(file_path, download_name, mimetype, etag=True, immutable=True):
+    """Send a file (a path or a file object) with a strong ETag, 304 and byte-range support, cacheable only by the browser
+
+    Immutable artifacts may be reused without revalidation for ARTIFACT_MAX_AGE_SECONDS;
+    anything else is revalidated against its ETag on every use.
+    """
+    # Stored paths are relative to the working directory; send_file would resolve them against the app root
+    if isinstance(file_path, str):
+        file_path = os.path.abspath(file_path)
+    response = send_file(
+        file_path,
+        as_attachment=True,
+        download_name=download_name,
+        mimetype=mimetype,
+        etag=etag,
+        max_age=ARTIFACT_MAX_AGE_SECONDS if immutable else 0,
+        conditional=True
+    )
+    # Downloads are per user, so shared caches must not keep them
+    response.cache_control.public = False
+    response.cache_control.private = True
+    if immutable:
+        response.cache_control.immutable = True
+    return response
+
+@app.route('/cleanup', methods=['POST'])
+def cleanup():
+    """Clean up temporary files after download"""
+    download_id = request.form.get('download_id')
+    
+    if download_id and download_id in download_results:
         try:
-            # Remove the temporary directory and its contents
-            import shutil
-            shutil.rmtree(f"{TEMP_DIR}/{download_id}", ignore_errors=True)
+            # Drop the job now; its folder is deleted by the background reaper
+            forget_download(download_id)
             
-            # Clean up tracking dictionaries
-            if download_id in download_progress:
-                del download_progress[download_id]
-            if download_id in download_results:
-                del download_results[download_id]
-            if download_id in download_titles:
-                del download_titles[download_id]
-            
-            # Save the updates to disk
-            save_download_results()
-                
             return jsonify({'status': 'success'})
         except Exception as e:
             logger.error(f"Error during cleanup: {str(e)}")
@@ -349,123 +1394,378 @@ def cleanup():
     
     return jsonify({'status': 'not_found'}), 404
 
-# Cleanup thread to remove old files periodically
-def cleanup_old_files():
-    """Remove files older than 24 hours and not in use"""
-    while True:
-        time.sleep(3600)  # Run every hour
-        try:
-            current_time = time.time()
-            for download_folder in os.listdir(TEMP_DIR):
-                folder_path = os.path.join(TEMP_DIR, download_folder)
-                if os.path.isdir(folder_path):
-                    download_id = os.path.basename(folder_path)
-                    
-                    # Skip folders that are still tracked in download_results
-                    if download_id in download_results:
-                        logger.debug(f"Skipping cleanup of folder in use: {folder_path}")
-                        continue
-                    
-                    # Check folder creation time
-                    creation_time = os.path.getctime(folder_path)
-                    if current_time - creation_time > 86400:  # Older than 24 hours (24*3600)
-                        import shutil
-                        shutil.rmtree(folder_path, ignore_errors=True)
-                        logger.debug(f"Cleaned up old folder: {folder_path}")
-        except Exception as e:
-            logger.error(f"Error during auto cleanup: {str(e)}")
+# Downloads expire DOWNLOAD_TTL_SECONDS after they were last served. When the audio cache and
+# per-download folders grow past TEMP_DIR_QUOTA_BYTES, the least recently served artifacts are
+# evicted first. Nothing else under temp_downloads (job store, transcription cache) counts
+# towards the quota, since evicting downloads can't free it.
+DOWNLOAD_TTL_SECONDS = int(os.environ.get('DOWNLOAD_TTL_SECONDS', 86400))
+TEMP_DIR_QUOTA_BYTES = int(os.environ.get('TEMP_DIR_QUOTA_BYTES', 10 * 1024 ** 3))
+REAPER_INTERVAL_SECONDS = int(os.environ.get('REAPER_INTERVAL_SECONDS', 300))
 
-# Start the cleanup thread
-threading.Thread(target=cleanup_old_files, daemon=True).start()
+# Expiry deadline (last served + TTL) of every download this worker knows about
+download_expiry = ExpiryIndex()
 
-# Transcription related functions and routes
-def format_time(seconds):
-    """Format seconds to SRT timestamp format (HH:MM:SS,mmm)"""
-    td = timedelta(seconds=seconds)
-    hours, remainder = divmod(td.seconds, 3600)
-    minutes, seconds = divmod(remainder, 60)
-    milliseconds = td.microseconds // 1000
-    return f"{hours:02}:{minutes:02}:{seconds:02},{milliseconds:03}"
-
-def extract_plain_text(transcription_data):
-    """Extract plain text without timestamps from ElevenLabs transcription data"""
-    # Extract all words from the transcription
-    words = [w for w in transcription_data.get('words', []) if w.get('type') == 'word']
-    
-    # Group words into paragraphs (10 words per paragraph)
-    paragraphs = []
-    
-    for i in range(0, len(words), 10):
-        group = words[i:i+10]
-        if not group:
+def touch_download(download_id, result=None):
+    """Mark a download as just served, pushing back its expiry"""
+    if result is None and download_id not in download_results:
+        return
+    
+    now = time.time()
+    # Write through to the shared store at most once a minute per download
+    if now - last_served_at(download_id, result or {}, 0) > 60:
+        download_last_served[download_id] = now
+    download_expiry.set(download_id, now + DOWNLOAD_TTL_SECONDS)
+
+def last_served_at(download_id, result, default=None):
+    """When a download was last served, falling back to when it finished"""
+    last_served = download_last_served.get(download_id)
+    if last_served is not None:
+        return last_served
+    # Results written before last_served had its own namespace carry it inline
+    return result.get('last_served', result.get('completed_at', default))
+
+def forget_download(download_id):
+    """Drop a download from every registry and queue its folder for deletion"""
+    result = download_results.get(download_id)
+    
+    # Clean up tracking dictionaries
+    download_progress.pop(download_id, None)
+    download_results.pop(download_id, None)
+    download_titles.pop(download_id, None)
+    download_last_served.pop(download_id, None)
+    mp3_conversions.pop(download_id, None)
+    reported_progress.pop(download_id, None)
+    render_cache.forget(download_id)
+    index_cache.forget(download_id)
+    search_index.remove(download_id)
+    progress_notifier.forget(download_id)
+    download_expiry.discard(download_id)
+    
+    artifact_reaper.delete_later(f"{TEMP_DIR}/{download_id}")
+    return result
+
+def live_workers():
+    """Workers that published recently; the metrics snapshot every worker publishes is its heartbeat"""
+    cutoff = time.time() - METRICS_STALE_SECONDS
+    live = {key for key, snapshot in metrics_snapshots.items() if snapshot['updated_at'] >= cutoff}
+    live.add(worker_id())
+    return live
+
+stray_progress_rows = set()
+
+def reap_orphaned_jobs():
+    """Fail jobs whose worker died before finishing them and drop their in-flight rows"""
+    global stray_progress_rows
+    now = time.time()
+    live = live_workers()
+    
+    for download_id, state in list(download_states.items()):
+        owner = state.get('owner')
+        if owner in live:
             continue
-            
-        # Create text content from the words with spaces between them
-        text_parts = []
-        for j, word in enumerate(group):
-            word_text = word.get('text', '')
-            
-            # Check if this is a spacing type or if we need to add a space
-            if j > 0 and not word_text.startswith((' ', '.', ',', '!', '?', ':', ';')):
-                # Add space before this word if it doesn't start with punctuation
-                text_parts.append(' ')
-            
-            text_parts.append(word_text)
-            
-        paragraphs.append("".join(text_parts).strip())
+        # Playlist expansions run on the download pool too but have no progress row or result
+        if download_id in download_progress and download_id not in download_results:
+            download_results[download_id] = {
+                'status': 'error',
+                'error': 'The server restarted before this download finished, please try again',
+                # The folder, if any, is on the dead worker's host
+                'host': owner.split(':')[0] if owner else socket.gethostname(),
+                'completed_at': now
+            }
+        download_states.pop(download_id, None)
+        download_progress.pop(download_id, None)
+        logger.debug(f"Reaped download {download_id} of exited worker {owner}")
+    
+    # Progress rows with neither a state nor a result were left by requests that died before
+    # queueing their job; a live request gets until the next pass to queue it
+    stray = {download_id for download_id in download_progress
+             if download_id not in download_states and download_id not in download_results}
+    for download_id in stray & stray_progress_rows:
+        download_progress.pop(download_id, None)
+    stray_progress_rows = stray
+    
+    for job_id, state in list(transcription_states.items()):
+        if state.get('owner') not in live:
+            transcription_states.pop(job_id, None)
     
-    # Join paragraphs with line breaks
-    return "\n\n".join(paragraphs)
+    for job_id, job in list(transcription_jobs.items()):
+        if job['status'] in ('success', 'error') or job.get('owner') in live:
+            continue
+        job.update({
+            'status': 'error',
+            'message': 'The server restarted before this transcription finished, please try again',
+            'completed_at': now
+        })
+        transcription_jobs[job_id] = job
+        logger.debug(f"Reaped transcription job {job_id} of exited worker {job.get('owner')}")
+    
+    for download_id, conversion in list(mp3_conversions.items()):
+        if conversion['status'] in ('queued', 'running') and conversion.get('owner') not in live:
+            conversion.update({'status': 'error', 'message': 'The server restarted during the conversion, please try again'})
+            mp3_conversions[download_id] = conversion
+    
+    for playlist_id, playlist in list(playlist_jobs.items()):
+        if playlist['status'] == 'expanding' and playlist.get('owner') not in live:
+            playlist.update({'status': 'error', 'error': 'The server restarted before this playlist was expanded'})
+            playlist_jobs[playlist_id] = playlist
 
-def create_srt_content(transcription_data):
-    """Create SRT file content from ElevenLabs transcription data"""
-    srt_content = ""
-    subtitle_index = 1
+def reap_temp_downloads():
+    """Reaper pass: expire downloads past their TTL, drop orphaned folders and enforce the disk quota"""
+    now = time.time()
+    results = dict(download_results.items())
+    # Other hosts sharing the store look after their own files
+    local_results = {download_id: result for download_id, result in results.items() if is_local_download(result)}
+    
+    # Index downloads finished or served by other workers since the last pass
+    for download_id, result in local_results.items():
+        if download_id in download_expiry:
+            continue
+        last_served = last_served_at(download_id, result)
+        if last_served is None:
+            # Older results carry no timestamps; start their clock now, once, in the shared store
+            last_served = download_last_served[download_id] = now
+        download_expiry.set(download_id, last_served + DOWNLOAD_TTL_SECONDS)
     
-    # Extract words from the transcription
-    words = [w for w in transcription_data.get('words', []) if w.get('type') == 'word']
+    # Expire downloads nobody has served within the TTL
+    for download_id in download_expiry.pop_expired(now):
+        result = download_results.get(download_id)
+        if result is None:
+            continue
+        # Another worker may have served it since; the shared record is authoritative
+        last_served = last_served_at(download_id, result, now)
+        if last_served + DOWNLOAD_TTL_SECONDS > now:
+            download_expiry.set(download_id, last_served + DOWNLOAD_TTL_SECONDS)
+            continue
+        logger.debug(f"Expired download: {download_id}")
+        forget_download(download_id)
+        results.pop(download_id, None)
     
-    # Group words into subtitles (max 10 words per subtitle)
-    for i in range(0, len(words), 10):
-        group = words[i:i+10]
-        if not group:
+    # Drop transcription jobs whose download is gone or that finished over a TTL ago
+    for job_id, job in list(transcription_jobs.items()):
+        if job['status'] not in ('success', 'error'):
             continue
-            
-        start_time = group[0].get('start', 0)
-        end_time = group[-1].get('end', start_time + 2)  # Default to 2 seconds after start if no end time
+        if job.get('download_id') not in results or now - job['completed_at'] > DOWNLOAD_TTL_SECONDS:
+            transcription_jobs.pop(job_id, None)
+    
+    # Drop preflight metadata past its TTL
+    for key, entry in list(video_info.items()):
+        if entry['expires_at'] <= now:
+            video_info.pop(key, None)
+    
+    # Drop playlists once none of their downloads is tracked any more
+    for playlist_id, playlist in list(playlist_jobs.items()):
+        # Keep pending and failed expansions around long enough to be reported
+        if playlist['status'] != 'running' and now - playlist['created_at'] <= DOWNLOAD_TTL_SECONDS:
+            continue
+        if not any(item in download_progress or item in results for item in playlist.get('items', ())):
+            playlist_jobs.pop(playlist_id, None)
+    
+    # Index transcripts finished by other workers and drop removed ones
+    sync_search_index(results)
+    
+    # Remove folders that no download tracks any more (e.g. failed before recording a result)
+    for download_folder in os.listdir(TEMP_DIR):
+        folder_path = os.path.join(TEMP_DIR, download_folder)
+        # The shared caches are not per-download folders
+        if os.path.abspath(folder_path) in (os.path.abspath(AUDIO_CACHE_DIR), os.path.abspath(TRANSCRIPTION_CACHE_DIR)):
+            continue
+        if not os.path.isdir(folder_path) or download_folder in results:
+            continue
+        # Jobs still queued or downloading have a folder but no result yet
+        if download_scheduler.status(download_folder) or download_folder in download_states:
+            continue
+        if now - os.path.getctime(folder_path) > DOWNLOAD_TTL_SECONDS:
+            artifact_reaper.delete_later(folder_path)
+    
+    # Cached audio no download references that hasn't been used within the TTL. The shared
+    # store is the only record of references; entries used since it was read are kept too.
+    video_refs = Counter(result.get('video_id') for result in local_results.values() if result.get('video_id'))
+    audio_cache.evict_unreferenced(DOWNLOAD_TTL_SECONDS, referenced=video_refs, used_before=now)
+    transcription_cache.evict_lru()
+    
+    if TEMP_DIR_QUOTA_BYTES <= 0:
+        return
+    
+    over_quota = evictable_usage() - TEMP_DIR_QUOTA_BYTES
+    if over_quota <= 0:
+        return
+    logger.debug(f"temp_downloads is {over_quota} bytes over quota, evicting least recently served artifacts")
+    
+    # Unreferenced cached audio is the cheapest to lose
+    over_quota -= audio_cache.evict_lru(over_quota, referenced=video_refs, used_before=now)
+    
+    # Then whole downloads, least recently served first, along with audio nobody else uses
+    while over_quota > 0:
+        entry = download_expiry.pop()
+        if entry is None:
+            break
+        _, download_id = entry
+        over_quota -= directory_size(f"{TEMP_DIR}/{download_id}")
+        result = forget_download(download_id) or {}
         
-        # Create text content from the words with spaces between them
-        # Using a space between each word
-        text_parts = []
-        for j, word in enumerate(group):
-            word_text = word.get('text', '')
-            
-            # Check if this is a spacing type or if we need to add a space
-            if j > 0 and not word_text.startswith((' ', '.', ',', '!', '?', ':', ';')):
-                # Add space before this word if it doesn't start with punctuation
-                text_parts.append(' ')
-            
-            text_parts.append(word_text)
-            
-        text = "".join(text_parts)
+        video_id = result.get('video_id')
+        if video_id:
+            video_refs[video_id] -= 1
+            if video_refs[video_id] <= 0:
+                del video_refs[video_id]
+                over_quota -= audio_cache.evict(video_id, referenced=video_refs, used_before=now)
+        logger.debug(f"Evicted download over quota: {download_id}")
+
+def evictable_usage():
+    """Bytes the quota applies to: the audio cache plus every per-download folder"""
+    total = directory_size(AUDIO_CACHE_DIR)
+    shared = (os.path.abspath(AUDIO_CACHE_DIR), os.path.abspath(TRANSCRIPTION_CACHE_DIR))
+    for entry in os.scandir(TEMP_DIR):
+        if entry.is_dir(follow_symlinks=False) and os.path.abspath(entry.path) not in shared:
+            total += directory_size(entry.path)
+    return total
+
+# Only one process per host restores the registry and runs the periodic pass; every
+# worker tries to take over each interval, so the duty moves on if that process exits
+service_lock = ServiceLock(os.path.join(TEMP_DIR, '.services.lock'))
+restored_results_loaded = False
+
+def run_shared_services():
+    """Reaper maintenance: one-time restore, then the periodic pass, in the elected process only"""
+    global restored_results_loaded
+    if not service_lock.acquire():
+        return
+    if not restored_results_loaded:
+        restored_results_loaded = True
+        load_download_results()
+    reap_orphaned_jobs()
+    reap_temp_downloads()
+    retire_stale_metrics()
+
+# Deletions requested by handlers run on one background thread in every worker;
+# the first maintenance pass runs right after boot
+artifact_reaper = BackgroundReaper(REAPER_INTERVAL_SECONDS, maintenance=run_shared_services, initial_delay=0)
+
+# Transcription related functions and routes
+# Overridable so the API can be swapped for a local stand-in (see benchmarks/load_test.py)
+ELEVENLABS_STT_URL = os.environ.get('ELEVENLABS_STT_URL', "https://api.elevenlabs.io/v1/speech-to-text")
+# Long audio is split at silences into chunks that are transcribed concurrently
+TRANSCRIPTION_CHUNK_MIN_SECONDS = int(os.environ.get('TRANSCRIPTION_CHUNK_MIN_SECONDS', 1200))
+TRANSCRIPTION_CHUNK_SECONDS = int(os.environ.get('TRANSCRIPTION_CHUNK_SECONDS', 600))
+TRANSCRIPTION_CHUNK_MAX_SECONDS = int(os.environ.get('TRANSCRIPTION_CHUNK_MAX_SECONDS', 900))
+TRANSCRIPTION_CHUNK_CONCURRENCY = int(os.environ.get('TRANSCRIPTION_CHUNK_CONCURRENCY', 4))
+
+# One pooled session for every ElevenLabs call: explicit timeouts, jittered retries that
+# honour Retry-After, and a breaker that fails fast while the API is down
+elevenlabs_client = ResilientClient(
+    timeout=(
+        float(os.environ.get('ELEVENLABS_CONNECT_TIMEOUT', 10)),
+        float(os.environ.get('ELEVENLABS_READ_TIMEOUT', 600))
+    ),
+    max_retries=int(os.environ.get('ELEVENLABS_MAX_RETRIES', 3)),
+    pool_size=max(10, TRANSCRIPTION_CHUNK_CONCURRENCY * 2),
+    breaker=CircuitBreaker(failure_threshold=5, reset_timeout=30),
+    on_attempt=lambda outcome, seconds: record_api_attempt(outcome, seconds)
+)
+
+def record_api_attempt(outcome, seconds):
+    api_requests.inc(status=outcome)
+    api_request_seconds.observe(seconds)
+
+class TranscriptionAPIError(Exception):
+    """Error response from the ElevenLabs speech-to-text API"""
+    def __init__(self, message, status_code):
+        super().__init__(message)
+        self.message = message
+        self.status_code = status_code
+
+def request_transcription(file_path, api_key, data):
+    """Send one audio file to ElevenLabs speech-to-text and return the parsed response"""
+    headers = {
+        "xi-api-key": api_key,
+        # We don't set Content-Type, requests will set it automatically with boundary
+    }
+    
+    audio_extension = os.path.splitext(file_path)[1].lstrip('.').lower()
+    
+    # Open file in binary mode
+    with open(file_path, 'rb') as audio_file:
+        files = {
+            # ElevenLabs accepts the native containers, so upload the file as stored
+            'file': (f'audio.{audio_extension}', audio_file, AUDIO_MIMETYPES.get(audio_extension, 'application/octet-stream'))
+        }
         
-        # We'll skip adding speaker info as per user's request
-        # speaker = group[0].get('speaker_id')
-        # if speaker:
-        #     text = f"[{speaker}] {text}"
-            
-        # Format subtitle entry
-        srt_content += f"{subtitle_index}\n"
-        srt_content += f"{format_time(start_time)} --> {format_time(end_time)}\n"
-        srt_content += f"{text.strip()}\n\n"
+        logger.debug(f"Sending ElevenLabs API request for {file_path} with params: {data}")
         
-        subtitle_index += 1
+        # Make the API request
+        try:
+            response = elevenlabs_client.post(ELEVENLABS_STT_URL, headers=headers, files=files, data=data)
+        except CircuitOpenError as e:
+            logger.error(str(e))
+            raise TranscriptionAPIError('The transcription service is temporarily unavailable, please try again shortly', 503)
+    
+    # Check if the request was successful
+    if response.status_code != 200:
+        # Handle API error
+        error_message = "Error from ElevenLabs API"
+        response_text = response.text
+        logger.error(f"ElevenLabs API error. Status code: {response.status_code}, Response: {response_text}")
         
-    return srt_content
+        try:
+            error_data = response.json()
+            error_message = error_data.get('detail', {}).get('message', error_message)
+        except Exception as e:
+            logger.error(f"Failed to parse error response: {str(e)}")
+        
+        raise TranscriptionAPIError(error_message, response.status_code)
+    
+    return response.json()
+
+def plan_transcription_chunks(file_path, diarize):
+    """Chunk boundaries for a long file, or None if it should go up in one request"""
+    # Speaker IDs are assigned per request and can't be matched up across chunks
+    if diarize:
+        return None
+    
+    try:
+        duration = probe_duration(file_path)
+        if duration < TRANSCRIPTION_CHUNK_MIN_SECONDS:
+            return None
+        chunks = plan_chunks(
+            duration,
+            detect_silences(file_path),
+            target_seconds=TRANSCRIPTION_CHUNK_SECONDS,
+            max_seconds=TRANSCRIPTION_CHUNK_MAX_SECONDS
+        )
+    except (OSError, subprocess.CalledProcessError, ValueError) as e:
+        logger.warning(f"Could not plan chunks for {file_path}, transcribing in one request: {str(e)}")
+        return None
+    
+    return chunks if len(chunks) > 1 else None
+
+def transcribe_audio(download_id, file_path, api_key, data, diarize):
+    """Transcribe a file, splitting long audio into chunks transcribed in parallel"""
+    chunks = plan_transcription_chunks(file_path, diarize)
+    if not chunks:
+        return request_transcription(file_path, api_key, data)
+    
+    chunk_dir = f"{TEMP_DIR}/{download_id}/chunks"
+    logger.debug(f"Transcribing {file_path} in {len(chunks)} chunks")
+    try:
+        chunk_paths = split_audio(file_path, chunks, chunk_dir)
+        with ThreadPoolExecutor(max_workers=TRANSCRIPTION_CHUNK_CONCURRENCY) as pool:
+            futures = [pool.submit(request_transcription, path, api_key, data) for path in chunk_paths]
+            try:
+                parts = [(start, future.result()) for (start, _), future in zip(chunks, futures)]
+            except Exception:
+                # Don't upload the remaining chunks once one has failed
+                for future in futures:
+                    future.cancel()
+                raise
+    finally:
+        import shutil
+        shutil.rmtree(chunk_dir, ignore_errors=True)
+    
+    return merge_transcriptions(parts)
 
 @app.route('/transcribe/<download_id>', methods=['POST'])
 def transcribe(download_id):
-    """Transcribe the downloaded audio file using ElevenLabs API"""
+    """Queue transcription of the downloaded audio file using ElevenLabs API"""
     if download_id not in download_results:
         return jsonify({
             'status': 'error',
@@ -497,161 +1797,326 @@ def transcribe(download_id):
     
     # Check if the file exists
     if not os.path.exists(file_path):
+        logger.error(f"Audio file not found at path: {file_path}")
         return jsonify({
             'status': 'error',
             'message': f'Audio file not found at: {file_path}. The file may have been deleted or moved.'
         }), 404
     
+    # Check if file is readable and has content
+    if os.path.getsize(file_path) == 0:
+        logger.error(f"Audio file exists but is empty: {file_path}")
+        return jsonify({
+            'status': 'error',
+            'message': 'Audio file is empty. Please download the file again.'
+        }), 400
+    
+    # The upload and ElevenLabs processing can take minutes, so run them as a background job.
+    # The API key is only handed to the job in memory, never written to the job store.
+    job_id = str(uuid.uuid4())
+    transcription_jobs[job_id] = {
+        'download_id': download_id,
+        'status': 'queued',
+        'owner': worker_id(),
+        'created_at': time.time()
+    }
+    
     try:
-        # Double-check if the file exists before proceeding
-        if not os.path.exists(file_path):
-            logger.error(f"Audio file not found at path: {file_path}")
-            return jsonify({
-                'status': 'error',
-                'message': 'Audio file not found on the server. Please download the file again.'
-            }), 404
-        
-        # Check if file is readable and has content
-        if os.path.getsize(file_path) == 0:
-            logger.error(f"Audio file exists but is empty: {file_path}")
-            return jsonify({
-                'status': 'error',
-                'message': 'Audio file is empty. Please download the file again.'
-            }), 400
-                
-        # Prepare the API request to ElevenLabs
-        url = "https://api.elevenlabs.io/v1/speech-to-text"
+        transcription_scheduler.submit(
+            job_id, run_transcription_job, job_id, download_id, api_key, diarize, tag_events
+        )
+    except QueueFullError as e:
+        logger.warning(str(e))
+        transcription_jobs.pop(job_id, None)
+        return jsonify({
+            'status': 'error',
+            'message': 'The server is busy, please try again in a few minutes'
+        }), 503
+    
+    return jsonify({
+        'status': 'started',
+        'job_id': job_id,
+        'queue_position': (transcription_scheduler.status(job_id) or {}).get('queue_position')
+    })
+
+def run_transcription_job(job_id, download_id, api_key, diarize, tag_events):
+    """Background job: transcribe a download and write its SRT/TXT files"""
+    job = transcription_jobs.get(job_id) or {'download_id': download_id}
+    job['status'] = 'running'
+    transcription_jobs[job_id] = job
+    
+    try:
+        result = download_results.get(download_id)
+        if result is None:
+            raise TranscriptionAPIError('The download was removed before it could be transcribed', 404)
+        file_path = result['file']
         
-        headers = {
-            "xi-api-key": api_key,
-            # We don't set Content-Type, requests will set it automatically with boundary
+        data = {
+            'model_id': 'scribe_v1',
+            'diarize': str(diarize).lower(),  # Convert to 'true' or 'false'
+            'tag_audio_events': str(tag_events).lower(),
+            'timestamps_granularity': 'word'
         }
         
-        # Open file in binary mode
-        with open(file_path, 'rb') as audio_file:
-            files = {
-                'file': ('audio.mp3', audio_file, 'audio/mpeg')
-            }
-            
-            data = {
-                'model_id': 'scribe_v1',
-                'diarize': str(diarize).lower(),  # Convert to 'true' or 'false'
-                'tag_audio_events': str(tag_events).lower(),
-                'timestamps_granularity': 'word'
-            }
-            
-            logger.debug(f"Sending ElevenLabs API request with params: {data}")
-            
-            # Make the API request
-            response = requests.post(url, headers=headers, files=files, data=data)
+        # Identical audio with identical options always transcribes the same way
+        with transcription_scheduler.stage(job_id, 'cache_lookup'):
+            cache_key = transcription_cache.make_key(file_path, data['model_id'], diarize, tag_events)
+            transcription_data = transcription_cache.get(cache_key)
+        record_cache_lookup('transcription', transcription_data is not None)
         
-        # Check if the request was successful
-        if response.status_code == 200:
-            transcription_data = response.json()
-            logger.debug(f"Received transcription data: {transcription_data}")
-            
-            # Create SRT file content
-            srt_content = create_srt_content(transcription_data)
-            
-            # Extract plain text without timestamps
-            plain_text = extract_plain_text(transcription_data)
-            
-            # Save SRT file
-            title = result.get('title', 'transcription')
-            srt_file_path = f"{TEMP_DIR}/{download_id}/{clean_filename(title)}.srt"
-            
-            with open(srt_file_path, 'w', encoding='utf-8') as srt_file:
-                srt_file.write(srt_content)
-                
-            # Save TXT file
-            txt_file_path = f"{TEMP_DIR}/{download_id}/{clean_filename(title)}.txt"
-            
-            with open(txt_file_path, 'w', encoding='utf-8') as txt_file:
-                txt_file.write(plain_text)
-            
-            logger.debug(f"Created SRT file at: {srt_file_path}")
-            logger.debug(f"Created TXT file at: {txt_file_path}")
-            
-            # Update download results to include transcription files
-            download_results[download_id]['srt_file'] = srt_file_path
-            download_results[download_id]['txt_file'] = txt_file_path
-            download_results[download_id]['transcription_data'] = transcription_data
-            
-            # Save updated results to disk
-            save_download_results()
-            
-            # Return success response with transcription data
-            return jsonify({
-                'status': 'success',
-                'text': plain_text,
-                'srt_preview': srt_content,
-                'plain_text': plain_text,
-                'language': transcription_data.get('language_code', 'en')
-            })
+        if transcription_data is not None:
+            logger.debug(f"Transcription cache hit for {download_id}: {cache_key}")
         else:
-            # Handle API error
-            error_message = "Error from ElevenLabs API"
-            response_text = response.text
-            logger.error(f"ElevenLabs API error. Status code: {response.status_code}, Response: {response_text}")
-            
-            try:
-                error_data = response.json()
-                error_message = error_data.get('detail', {}).get('message', error_message)
-            except Exception as e:
-                logger.error(f"Failed to parse error response: {str(e)}")
-                
-            return jsonify({
-                'status': 'error',
-                'message': error_message,
-                'code': response.status_code
-            }), 400
-            
+            with transcription_scheduler.stage(job_id, 'transcribe'):
+                transcription_data = transcribe_audio(download_id, file_path, api_key, data, diarize)
+            logger.debug(f"Received transcription data: {transcription_data}")
+            transcription_cache.put(cache_key, transcription_data)
+        
+        with transcription_scheduler.stage(job_id, 'store'):
+            transcription_file = save_transcription_data(download_id, transcription_data)
+        
+        # Re-read the record: it may have changed (e.g. been served) while we were transcribing
+        result = download_results.get(download_id)
+        if result is None:
+            raise TranscriptionAPIError('The download was removed while it was being transcribed', 404)
+        
+        # Transcripts are rendered from the stored data on demand; drop files older versions wrote
+        for fmt in TRANSCRIPT_FORMATS:
+            result.pop(f'{fmt}_file', None)
+        result['transcript_version'] = cache_key[:16]
+        result['transcription_file'] = transcription_file
+        result.pop('transcription_data', None)
+        download_results[download_id] = result
+        touch_download(download_id, result)
+        
+        # Build the time index while the data is at hand so the first range query is fast
+        with transcription_scheduler.stage(job_id, 'index'):
+            index_cache.put(
+                (download_id, result['transcript_version'], segmentation_tag(DEFAULT_SEGMENTATION)),
+                TranscriptIndex(transcription_data, **DEFAULT_SEGMENTATION)
+            )
+            search_index.add(download_id, transcription_data, result['transcript_version'])
+        
+        job.update({
+            'status': 'success',
+            'language': transcription_data.get('language_code', 'en')
+        })
+    except TranscriptionAPIError as e:
+        job.update({'status': 'error', 'message': e.message, 'code': e.status_code})
     except Exception as e:
         logger.error(f"Error during transcription: {str(e)}")
+        job.update({'status': 'error', 'message': str(e)})
+    
+    job['completed_at'] = time.time()
+    job['timings'] = job_timer.timings(job_id)
+    transcription_jobs[job_id] = job
+    jobs_finished.inc(pipeline='transcription', status=job['status'])
+
+@app.route('/transcription_progress/<job_id>')
+def transcription_progress(job_id):
+    """Get the status of a transcription job, with the transcript once it has finished"""
+    job = transcription_jobs.get(job_id)
+    if job is None:
         return jsonify({
             'status': 'error',
-            'message': str(e)
-        }), 500
+            'message': 'Transcription job not found'
+        }), 404
+    
+    if job['status'] == 'error':
+        return jsonify({
+            'status': 'error',
+            'finished': True,
+            'message': job.get('message', 'Unknown error'),
+            'code': job.get('code'),
+            'timings': job.get('timings', {})
+        })
+    
+    if job['status'] != 'success':
+        # Jobs queued on another worker process are reported from the shared store
+        job_status = transcription_scheduler.status(job_id) or transcription_states.get(job_id) or {}
+        return jsonify({
+            'status': 'transcribing',
+            'finished': False,
+            'state': job_status.get('state', job['status']),
+            'queue_position': job_status.get('queue_position'),
+            'timings': job_timer.timings(job_id) or job_status.get('timings', {})
+        })
+    
+    result = download_results.get(job['download_id'], {})
+    srt_content = (render_transcript_format(job['download_id'], result, 'srt', DEFAULT_SEGMENTATION) or b'').decode('utf-8')
+    plain_text = (render_transcript_format(job['download_id'], result, 'txt', DEFAULT_SEGMENTATION) or b'').decode('utf-8')
+    
+    # Return success response with transcription data
+    return jsonify({
+        'status': 'success',
+        'finished': True,
+        'download_id': job['download_id'],
+        'transcript_version': result.get('transcript_version'),
+        'text': plain_text,
+        'srt_preview': srt_content,
+        'plain_text': plain_text,
+        'language': job.get('language', 'en'),
+        'timings': job.get('timings', {})
+    })
 
-@app.route('/get_srt/<download_id>')
-def get_srt(download_id):
-    """Send the transcription SRT file to the user"""
-    if download_id not in download_results:
+# Mimetypes of the formats transcripts can be rendered to
+TRANSCRIPT_FORMATS = {
+    'srt': 'text/srt',
+    'vtt': 'text/vtt',
+    'txt': 'text/plain',
+    'json': 'application/json',
+}
+
+# Rendered transcripts are kept in a small in-process LRU cache
+render_cache = RenderCache(
+    max_entries=int(os.environ.get('RENDER_CACHE_ENTRIES', 64)),
+    max_bytes=int(os.environ.get('RENDER_CACHE_BYTES', 32 * 1024 * 1024))
+)
+
+def parse_segmentation(args):
+    """Cue segmentation requested in the query string; raises ValueError on bad values"""
+    segmentation = dict(DEFAULT_SEGMENTATION)
+    if args.get('words_per_cue'):
+        segmentation['words_per_cue'] = int(args['words_per_cue'])
+        if not 1 <= segmentation['words_per_cue'] <= 500:
+            raise ValueError('words_per_cue must be between 1 and 500')
+    if args.get('max_chars'):
+        segmentation['max_chars'] = int(args['max_chars'])
+        if segmentation['max_chars'] < 1:
+            raise ValueError('max_chars must be positive')
+    if args.get('max_duration'):
+        segmentation['max_duration'] = float(args['max_duration'])
+        if not segmentation['max_duration'] > 0:
+            raise ValueError('max_duration must be positive')
+    if args.get('speakers'):
+        segmentation['speaker_labels'] = args['speakers'].lower() == 'true'
+    return segmentation
+
+def segmentation_tag(segmentation):
+    """Short stable string identifying a segmentation, for cache keys and ETags"""
+    return "w{words_per_cue}-c{max_chars}-d{max_duration}-s{speaker_labels:d}".format(**segmentation)
+
+def render_transcript_format(download_id, result, fmt, segmentation):
+    """Rendered transcript as UTF-8 bytes, from the render cache when possible; None if not transcribed"""
+    key = (download_id, result.get('transcript_version'), fmt, segmentation_tag(segmentation))
+    content = render_cache.get(key)
+    record_cache_lookup('render', content is not None)
+    if content is not None:
+        return content
+    
+    with server_timing('load', 'transcript data'):
+        transcription_data = load_transcription_data(download_id)
+    if transcription_data is None:
+        return None
+    
+    with server_timing('render', fmt):
+        content = render_transcript_strings(transcription_data, (fmt,), **segmentation)[fmt].encode('utf-8')
+    render_cache.put(key, content)
+    return content
+
+# Time indexes of recently queried transcripts, bounded by their estimated memory
+index_cache = RenderCache(
+    max_entries=int(os.environ.get('TRANSCRIPT_INDEX_ENTRIES', 32)),
+    max_bytes=int(os.environ.get('TRANSCRIPT_INDEX_BYTES', 64 * 1024 * 1024)),
+    sizeof=lambda index: index.size_estimate()
+)
+
+def get_transcript_index(download_id, result, segmentation):
+    """Sorted start-time index of a transcript, built once per version and segmentation"""
+    key = (download_id, result.get('transcript_version'), segmentation_tag(segmentation))
+    index = index_cache.get(key)
+    record_cache_lookup('transcript_index', index is not None)
+    if index is not None:
+        return index
+    
+    with server_timing('load', 'transcript data'):
+        transcription_data = load_transcription_data(download_id)
+    if transcription_data is None:
+        return None
+    
+    with server_timing('index'):
+        index = TranscriptIndex(transcription_data, **segmentation)
+    index_cache.put(key, index)
+    return index
+
+@app.route('/search')
+def search_transcripts():
+    """Find transcripts containing every word of ?q=, with the timestamp of each match"""
+    query = request.args.get('q', '').strip()
+    if not query:
+        return jsonify({
+            'status': 'error',
+            'message': 'A search query is required'
+        }), 400
+    
+    try:
+        limit = max(1, min(int(request.args.get('limit', 20)), 100))
+    except ValueError:
+        limit = 20
+    phrase = request.args.get('phrase', 'false').lower() == 'true'
+    
+    with server_timing('search'):
+        results = search_index.search(query, phrase=phrase, limit=limit)
+    for result in results:
+        result['title'] = download_results.get(result['download_id'], {}).get('title', 'download')
+    
+    return jsonify({
+        'status': 'success',
+        'query': query,
+        'results': results
+    })
+
+@app.route('/transcript/<download_id>')
+def transcript_range(download_id):
+    """Words or cues of a transcript within a time window (?start=&end=, seconds or [HH:]MM:SS)"""
+    result = download_results.get(download_id)
+    if result is None:
         return jsonify({
             'status': 'error',
             'message': 'Transcription not found'
         }), 404
     
-    result = download_results[download_id]
-    
-    if 'srt_file' not in result:
+    try:
+        start = parse_timestamp(request.args.get('start') or '0')
+        end = parse_timestamp(request.args['end']) if request.args.get('end') else float('inf')
+        segmentation = parse_segmentation(request.args)
+    except ValueError as e:
         return jsonify({
             'status': 'error',
-            'message': 'SRT file not available'
+            'message': str(e)
         }), 400
     
-    # Get the file path
-    file_path = result['srt_file']
-    title = result.get('title', 'transcription')
+    if end <= start:
+        return jsonify({
+            'status': 'error',
+            'message': 'end must be after start'
+        }), 400
     
-    # Check if the file exists
-    if not os.path.exists(file_path):
+    index = get_transcript_index(download_id, result, segmentation)
+    if index is None:
         return jsonify({
             'status': 'error',
-            'message': 'SRT file not found on the server. It may have been deleted.'
-        }), 404
+            'message': 'This download has not been transcribed'
+        }), 400
     
-    # Send the file
-    return send_file(
-        file_path,
-        as_attachment=True,
-        download_name=f"{clean_filename(title)}.srt",
-        mimetype="text/srt"
-    )
+    touch_download(download_id, result)
+    
+    response = {
+        'status': 'success',
+        'download_id': download_id,
+        'language': index.language,
+        'start': start,
+        'end': end if end != float('inf') else None,
+    }
+    if request.args.get('granularity', 'words') == 'cues':
+        response['cues'] = index.cues_between(start, end)
+    else:
+        response['words'] = index.words_between(start, end)
+        response['text'] = index.text_between(start, end)
+    return jsonify(response)
 
-@app.route('/get_txt/<download_id>')
-def get_txt(download_id):
-    """Send the transcription TXT file to the user"""
+def send_transcript_file(download_id, fmt, mimetype):
+    """Render one transcript format of a download on demand and send it to the user"""
     if download_id not in download_results:
         return jsonify({
             'status': 'error',
@@ -659,28 +2124,158 @@ def get_txt(download_id):
         }), 404
     
     result = download_results[download_id]
+    label = fmt.upper()
     
-    if 'txt_file' not in result:
+    try:
+        segmentation = parse_segmentation(request.args)
+    except ValueError as e:
         return jsonify({
             'status': 'error',
-            'message': 'TXT file not available'
+            'message': f'Invalid segmentation: {str(e)}'
         }), 400
     
-    # Get the file path
-    file_path = result['txt_file']
+    content = render_transcript_format(download_id, result, fmt, segmentation)
+    if content is None:
+        # Results from before on-demand rendering may only have the file written back then
+        file_path = result.get(f'{fmt}_file')
+        if file_path and os.path.exists(file_path) and segmentation == DEFAULT_SEGMENTATION:
+            with open(file_path, 'rb') as f:
+                content = f.read()
+        else:
+            return jsonify({
+                'status': 'error',
+                'message': f'{label} file not available'
+            }), 400
+    
     title = result.get('title', 'transcription')
     
-    # Check if the file exists
-    if not os.path.exists(file_path):
-        return jsonify({
-            'status': 'error',
-            'message': 'TXT file not found on the server. It may have been deleted.'
-        }), 404
+    # Serving a file pushes back its expiry
+    touch_download(download_id, result)
+    
+    # Re-transcribing with other options changes what this URL renders, so only a URL
+    # carrying the current transcript version (?v=) may skip revalidation
+    version = result.get('transcript_version')
+    immutable = version is not None and request.args.get('v') == version
     
     # Send the file
-    return send_file(
-        file_path,
-        as_attachment=True,
-        download_name=f"{clean_filename(title)}.txt",
-        mimetype="text/plain"
+    return send_artifact(
+        io.BytesIO(content),
+        f"{clean_filename(title)}.{fmt}",
+        mimetype,
+        etag=f"{version or 'legacy'}.{segmentation_tag(segmentation)}.{fmt}",
+        immutable=immutable
     )
+
+@app.route('/get_srt/<download_id>')
+def get_srt(download_id):
+    """Send the transcription SRT file to the user"""
+    return send_transcript_file(download_id, 'srt', TRANSCRIPT_FORMATS['srt'])
+
+@app.route('/get_vtt/<download_id>')
+def get_vtt(download_id):
+    """Send the transcription WebVTT file to the user"""
+    return send_transcript_file(download_id, 'vtt', TRANSCRIPT_FORMATS['vtt'])
+
+@app.route('/get_txt/<download_id>')
+def get_txt(download_id):
+    """Send the transcription TXT file to the user"""
+    return send_transcript_file(download_id, 'txt', TRANSCRIPT_FORMATS['txt'])
+
+@app.route('/get_json/<download_id>')
+def get_json(download_id):
+    """Send the transcription segments as a JSON file to the user"""
+    return send_transcript_file(download_id, 'json', TRANSCRIPT_FORMATS['json'])
+
+# Disk usage is walked at most once per interval, however often /metrics is scraped
+METRICS_DISK_USAGE_SECONDS = int(os.environ.get('METRICS_DISK_USAGE_SECONDS', 60))
+disk_usage_sample = {'measured_at': 0, 'areas': {}}
+disk_usage_lock = threading.Lock()
+
+def temp_dir_usage():
+    """Bytes used under TEMP_DIR by the audio cache, the transcription cache and per-download folders"""
+    with disk_usage_lock:
+        if time.time() - disk_usage_sample['measured_at'] >= METRICS_DISK_USAGE_SECONDS:
+            audio = directory_size(AUDIO_CACHE_DIR)
+            transcriptions = directory_size(TRANSCRIPTION_CACHE_DIR)
+            disk_usage_sample['areas'] = {
+                'audio_cache': audio,
+                'transcription_cache': transcriptions,
+                'downloads': max(0, directory_size(TEMP_DIR) - audio - transcriptions),
+            }
+            disk_usage_sample['measured_at'] = time.time()
+        return disk_usage_sample['areas']
+
+@metrics.add_collector
+def collect_shared_metrics():
+    """Gauges read from the shared job store and disk at scrape time (the same from every worker)"""
+    jobs = Gauge('ytt_jobs', 'Jobs in the job store by pipeline and status', ('pipeline', 'status'))
+    downloads = Counter(result.get('status', 'unknown') for result in download_results.values())
+    # Downloads without a result yet are queued or running; report the scheduler state they're in
+    for download_id, state in download_states.items():
+        if download_id not in download_results:
+            downloads[state.get('state', 'queued')] += 1
+    for status, count in downloads.items():
+        jobs.set(count, pipeline='download', status=status)
+    for status, count in Counter(job.get('status', 'unknown') for job in transcription_jobs.values()).items():
+        jobs.set(count, pipeline='transcription', status=status)
+    
+    disk = Gauge('ytt_temp_dir_bytes', f'Disk used under {TEMP_DIR} by area', ('area',))
+    for area, size in temp_dir_usage().items():
+        disk.set(size, area=area)
+    return [jobs, disk]
+
+def metrics_process_key():
+    return worker_id()
+
+def publish_metrics():
+    """Write this worker's metrics snapshot to the job store"""
+    for pipeline, scheduler in (('download', download_scheduler), ('transcription', transcription_scheduler)):
+        stats = scheduler.stats()
+        # Report every state seen so far, so a drained state goes back to 0
+        for key, _ in scheduler_jobs.samples():
+            if key[0] == pipeline and key[1] not in stats['states']:
+                scheduler_jobs.set(0, pipeline=pipeline, state=key[1])
+        for state, count in stats['states'].items():
+            scheduler_jobs.set(count, pipeline=pipeline, state=state)
+    metrics_snapshots[metrics_process_key()] = {'updated_at': time.time(), 'metrics': metrics.snapshot()}
+
+def retire_stale_metrics():
+    """Fold the counters of this host's exited workers into one record (run by the elected process)"""
+    host = socket.gethostname()
+    retired_key = f"{host}:retired"
+    cutoff = time.time() - METRICS_STALE_SECONDS
+    for key, snapshot in list(metrics_snapshots.items()):
+        if not key.startswith(f"{host}:") or key == retired_key or snapshot['updated_at'] >= cutoff:
+            continue
+        retired = metrics_snapshots.get(retired_key) or {'updated_at': 0, 'metrics': {}}
+        retired['metrics'] = metrics.merge([retired['metrics'], snapshot['metrics']], include_gauges=False)
+        metrics_snapshots[retired_key] = retired
+        metrics_snapshots.pop(key, None)
+        logger.debug(f"Retired metrics of exited worker {key}")
+
+metrics_publisher = SnapshotPublisher(METRICS_PUBLISH_SECONDS, publish_metrics)
+
+@app.route('/metrics')
+def prometheus_metrics():
+    """Prometheus text exposition summed over every worker"""
+    publish_metrics()
+    cutoff = time.time() - METRICS_STALE_SECONDS
+    live, stale = [], []
+    for key, snapshot in metrics_snapshots.items():
+        (live if snapshot['updated_at'] >= cutoff else stale).append(snapshot['metrics'])
+    return Response(metrics.render(live, stale), content_type=METRICS_CONTENT_TYPE)
+
+def create_app():
+    """Prepare the app for serving in this process and return it
+
+    Importing this module only defines routes and configuration; directories,
+    background threads and the yt-dlp machinery are set up here or on first
+    use, which keeps worker boot fast. Safe to call more than once, and in
+    forked workers.
+    """
+    for directory in (TEMP_DIR, AUDIO_CACHE_DIR, TRANSCRIPTION_CACHE_DIR):
+        os.makedirs(directory, exist_ok=True)
+    artifact_reaper.start()
+    metrics_publisher.start()
+    start_search_index_sync()
+    return app
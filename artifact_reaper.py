@@ -0,0 +1,147 @@
+import os
+import heapq
+import shutil
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+def directory_size(path):
+    """Total size in bytes of the files under a directory"""
+    total = 0
+    try:
+        entries = list(os.scandir(path))
+    except FileNotFoundError:
+        return 0
+    for entry in entries:
+        try:
+            if entry.is_dir(follow_symlinks=False):
+                total += directory_size(entry.path)
+            else:
+                total += entry.stat(follow_symlinks=False).st_size
+        except FileNotFoundError:
+            continue
+    return total
+
+
+class ExpiryIndex:
+    """Min-heap of deadlines keyed by artifact, with lazy invalidation.
+
+    Updating a key pushes a new heap entry; entries whose deadline no longer
+    matches the key's current one are skipped when they reach the top. The
+    earliest deadline is also the least recently served artifact, so the
+    same heap gives LRU order for quota eviction.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._heap = []
+        self._deadlines = {}
+
+    def __len__(self):
+        return len(self._deadlines)
+
+    def __contains__(self, key):
+        return key in self._deadlines
+
+    def set(self, key, deadline):
+        """Set (or move) the deadline of a key"""
+        with self._lock:
+            self._deadlines[key] = deadline
+            heapq.heappush(self._heap, (deadline, key))
+            # Rebuild once stale entries dominate so the heap doesn't grow without bound
+            if len(self._heap) > 2 * len(self._deadlines) + 64:
+                self._heap = [(d, k) for k, d in self._deadlines.items()]
+                heapq.heapify(self._heap)
+
+    def discard(self, key):
+        with self._lock:
+            self._deadlines.pop(key, None)
+
+    def _drop_stale(self):
+        # Called with self._lock held
+        while self._heap and self._deadlines.get(self._heap[0][1]) != self._heap[0][0]:
+            heapq.heappop(self._heap)
+
+    def peek(self):
+        """(deadline, key) with the earliest deadline, or None if empty"""
+        with self._lock:
+            self._drop_stale()
+            return self._heap[0] if self._heap else None
+
+    def pop(self):
+        """Remove and return the (deadline, key) with the earliest deadline, or None if empty"""
+        with self._lock:
+            self._drop_stale()
+            if not self._heap:
+                return None
+            deadline, key = heapq.heappop(self._heap)
+            del self._deadlines[key]
+            return deadline, key
+
+    def pop_expired(self, now):
+        """Remove and return every key whose deadline has passed"""
+        expired = []
+        while True:
+            with self._lock:
+                self._drop_stale()
+                if not self._heap or self._heap[0][0] > now:
+                    return expired
+                deadline, key = heapq.heappop(self._heap)
+                del self._deadlines[key]
+            expired.append(key)
+
+
+class BackgroundReaper:
+    """Background thread that deletes paths off the request path and runs periodic maintenance"""
+
+    def __init__(self, interval, maintenance=None, initial_delay=None):
+        self.interval = interval
+        self.maintenance = maintenance
+        # Seconds before the first maintenance pass (a full interval by default)
+        self.initial_delay = interval if initial_delay is None else initial_delay
+        self._cond = threading.Condition()
+        self._pending = []
+        self._thread = None
+
+    def start(self):
+        """Start the reaper thread (idempotent, and restarts it in a forked child)"""
+        with self._cond:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name='artifact-reaper', daemon=True)
+            self._thread.start()
+
+    def delete_later(self, path):
+        """Queue a file or directory for deletion by the reaper thread"""
+        with self._cond:
+            self._pending.append(path)
+            self._cond.notify()
+
+    def _delete_pending(self):
+        with self._cond:
+            pending, self._pending = self._pending, []
+        for path in pending:
+            if os.path.isdir(path):
+                shutil.rmtree(path, ignore_errors=True)
+            elif os.path.exists(path):
+                os.remove(path)
+            logger.debug(f"Reaped: {path}")
+
+    def _run(self):
+        last_maintenance = time.time() - self.interval + self.initial_delay
+        while True:
+            with self._cond:
+                if not self._pending:
+                    self._cond.wait(max(0, last_maintenance + self.interval - time.time()))
+
+            try:
+                self._delete_pending()
+                if self.maintenance is not None and time.time() - last_maintenance >= self.interval:
+                    last_maintenance = time.time()
+                    self.maintenance()
+                    self._delete_pending()
+            except Exception as e:
+                logger.error(f"Error during reaper pass: {str(e)}")
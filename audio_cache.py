@@ -0,0 +1,184 @@
+import os
+import shutil
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: fall back to in-process locking only
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+
+class AudioCache:
+    """Shared, content-addressed store of extracted audio keyed by video ID.
+
+    Every video gets one directory (``<cache_dir>/<video_id>/``) holding the
+    extracted audio file. The cache keeps no record of which downloads point
+    at an entry: eviction is handed the video IDs still referenced (read
+    from the shared job store by the caller) and ``used_before``, the time
+    that list was read, so entries used since then are kept too. Unreferenced
+    entries stay around as cache hits until ``evict_unreferenced`` reclaims
+    them.
+
+    Fills are serialized per video both between threads and, through a lock
+    file, between worker processes sharing the cache directory. The cache
+    directory itself is created by the app at startup, not on construction.
+    """
+
+    def __init__(self, cache_dir, extensions=('m4a', 'webm', 'opus', 'ogg', 'aac', 'mp3')):
+        self.cache_dir = cache_dir
+        self.extensions = tuple(extensions)
+        self._lock = threading.Lock()
+        self._fill_locks = {}
+
+    def entry_dir(self, video_id):
+        """Directory holding the cached audio for a video"""
+        return os.path.join(self.cache_dir, video_id)
+
+    def output_template(self):
+        """yt-dlp output template that writes straight into the cache"""
+        return os.path.join(self.cache_dir, '%(id)s', '%(id)s.%(ext)s')
+
+    def _thread_lock(self, video_id):
+        with self._lock:
+            lock = self._fill_locks.get(video_id)
+            if lock is None:
+                lock = self._fill_locks[video_id] = threading.Lock()
+            return lock
+
+    @contextmanager
+    def fill_lock(self, video_id):
+        """Lock serializing lookups, fills and evictions for one video"""
+        with self._thread_lock(video_id):
+            if fcntl is None:
+                yield
+                return
+
+            lock_path = self._lock_path(video_id)
+            while True:
+                lock_file = open(lock_path, 'a')
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                # Eviction deletes the lock file while holding it; if that happened while
+                # we waited, our lock is on an unlinked file, so lock the current one instead
+                try:
+                    if os.stat(lock_path).st_ino == os.fstat(lock_file.fileno()).st_ino:
+                        break
+                except FileNotFoundError:
+                    pass
+                lock_file.close()
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+                lock_file.close()
+
+    def _lock_path(self, video_id):
+        return os.path.join(self.cache_dir, f".{video_id}.lock")
+
+    def _remove_lock_file(self, video_id):
+        # Only called with the fill lock held; waiters re-check the inode after locking
+        try:
+            os.remove(self._lock_path(video_id))
+        except FileNotFoundError:
+            pass
+
+    def lookup(self, video_id, extensions=None):
+        """Return the cached audio path for a video, or None on a miss
+
+        Extensions are tried in order (the cache's own order by default), so an
+        entry holding both the native download and an MP3 conversion of it
+        resolves to whichever the caller prefers.
+        """
+        entry_dir = self.entry_dir(video_id)
+        try:
+            names = os.listdir(entry_dir)
+        except FileNotFoundError:
+            return None
+
+        by_extension = {name.rsplit('.', 1)[-1]: name for name in names if '.' in name}
+        for extension in extensions or self.extensions:
+            name = by_extension.get(extension)
+            if name is None:
+                continue
+            path = os.path.join(entry_dir, name)
+            if os.path.getsize(path) > 0:
+                # Refresh the mtime so eviction sees this entry as recently used
+                os.utime(entry_dir)
+                return path
+        return None
+
+    def touch(self, video_id):
+        """Mark an entry as just used, e.g. once a download recording it has been stored"""
+        try:
+            os.utime(self.entry_dir(video_id))
+        except FileNotFoundError:
+            pass
+
+    def _in_use(self, video_id, referenced, used_before):
+        # Called with the entry's fill lock held
+        if video_id in referenced:
+            return True
+        # File timestamps come from a coarser clock than time.time(), so allow a second of slack
+        try:
+            return used_before is not None and os.path.getmtime(self.entry_dir(video_id)) >= used_before - 1
+        except FileNotFoundError:
+            return False
+
+    def evict(self, video_id, referenced=(), used_before=None):
+        """Delete one entry if nobody references it, returning the bytes freed"""
+        entry_dir = self.entry_dir(video_id)
+        with self.fill_lock(video_id):
+            if self._in_use(video_id, referenced, used_before) or not os.path.isdir(entry_dir):
+                return 0
+            size = sum(
+                os.path.getsize(os.path.join(entry_dir, name)) for name in os.listdir(entry_dir)
+            )
+            shutil.rmtree(entry_dir, ignore_errors=True)
+            self._remove_lock_file(video_id)
+        logger.debug(f"Evicted cached audio: {entry_dir}")
+        return size
+
+    def evict_lru(self, bytes_to_free, referenced=(), used_before=None):
+        """Delete unreferenced entries, least recently used first, until bytes_to_free are reclaimed"""
+        entries = []
+        for video_id in os.listdir(self.cache_dir):
+            entry_dir = self.entry_dir(video_id)
+            try:
+                if os.path.isdir(entry_dir):
+                    entries.append((os.path.getmtime(entry_dir), video_id))
+            except FileNotFoundError:
+                continue
+
+        freed = 0
+        for _, video_id in sorted(entries):
+            if freed >= bytes_to_free:
+                break
+            freed += self.evict(video_id, referenced, used_before)
+        return freed
+
+    def evict_unreferenced(self, max_age, referenced=(), used_before=None):
+        """Delete entries nobody references that were last used over max_age seconds ago"""
+        current_time = time.time()
+        evicted = []
+        for video_id in os.listdir(self.cache_dir):
+            entry_dir = self.entry_dir(video_id)
+            if not os.path.isdir(entry_dir):
+                continue
+
+            with self.fill_lock(video_id):
+                if self._in_use(video_id, referenced, used_before):
+                    continue
+                try:
+                    last_used = os.path.getmtime(entry_dir)
+                except FileNotFoundError:
+                    continue
+                if current_time - last_used > max_age:
+                    shutil.rmtree(entry_dir, ignore_errors=True)
+                    self._remove_lock_file(video_id)
+                    evicted.append(video_id)
+                    logger.debug(f"Evicted cached audio: {entry_dir}")
+        return evicted
@@ -0,0 +1,118 @@
+import os
+import re
+import logging
+import subprocess
+
+logger = logging.getLogger(__name__)
+
+SILENCE_START_RE = re.compile(r'silence_start: (-?[\d.]+)')
+SILENCE_END_RE = re.compile(r'silence_end: (-?[\d.]+)')
+
+
+def probe_duration(file_path):
+    """Duration of an audio file in seconds, read with ffprobe"""
+    output = subprocess.run(
+        ['ffprobe', '-v', 'error', '-show_entries', 'format=duration',
+         '-of', 'default=noprint_wrappers=1:nokey=1', file_path],
+        check=True, capture_output=True, text=True
+    ).stdout.strip()
+    return float(output)
+
+
+def detect_silences(file_path, noise='-35dB', min_silence=0.5):
+    """List of (start, end) silent intervals found by ffmpeg's silencedetect filter"""
+    stderr = subprocess.run(
+        ['ffmpeg', '-hide_banner', '-nostats', '-i', file_path,
+         '-af', f'silencedetect=noise={noise}:d={min_silence}', '-f', 'null', '-'],
+        check=True, capture_output=True, text=True
+    ).stderr
+
+    silences = []
+    start = None
+    for line in stderr.splitlines():
+        match = SILENCE_START_RE.search(line)
+        if match:
+            start = max(0.0, float(match.group(1)))
+            continue
+        match = SILENCE_END_RE.search(line)
+        if match and start is not None:
+            silences.append((start, float(match.group(1))))
+            start = None
+    return silences
+
+
+def plan_chunks(duration, silences, target_seconds=600, max_seconds=900):
+    """Split [0, duration] into (start, end) chunks cut in the middle of silences.
+
+    Each cut is the silence midpoint closest to ``target_seconds`` after the
+    previous cut. If no silence falls before ``max_seconds``, the chunk is
+    cut hard at ``max_seconds``.
+    """
+    cut_points = sorted((start + end) / 2 for start, end in silences)
+    chunks = []
+    chunk_start = 0.0
+
+    while duration - chunk_start > max_seconds:
+        candidates = [
+            point for point in cut_points
+            if chunk_start + target_seconds / 2 <= point <= chunk_start + max_seconds
+        ]
+        if candidates:
+            cut = min(candidates, key=lambda point: abs(point - (chunk_start + target_seconds)))
+        else:
+            cut = chunk_start + max_seconds
+        chunks.append((chunk_start, cut))
+        chunk_start = cut
+
+    chunks.append((chunk_start, duration))
+    return chunks
+
+
+def split_audio(file_path, chunks, output_dir):
+    """Cut an audio file into the planned chunks by stream copy; returns the chunk paths"""
+    os.makedirs(output_dir, exist_ok=True)
+    extension = os.path.splitext(file_path)[1]
+    paths = []
+    for index, (start, end) in enumerate(chunks):
+        chunk_path = os.path.join(output_dir, f"chunk_{index:04d}{extension}")
+        subprocess.run(
+            ['ffmpeg', '-y', '-loglevel', 'error', '-ss', f'{start:.3f}', '-to', f'{end:.3f}',
+             '-i', file_path, '-vn', '-c', 'copy', chunk_path],
+            check=True, capture_output=True
+        )
+        paths.append(chunk_path)
+    return paths
+
+
+def merge_transcriptions(parts):
+    """Merge per-chunk transcriptions into one, shifting word timestamps by each chunk's offset
+
+    ``parts`` is a list of (offset_seconds, transcription_data) in playback order.
+    """
+    if not parts:
+        return {'text': '', 'words': []}
+
+    merged = {key: value for key, value in parts[0][1].items() if key not in ('text', 'words')}
+    texts = []
+    words = []
+
+    for index, (offset, data) in enumerate(parts):
+        text = data.get('text', '').strip()
+        if text:
+            texts.append(text)
+
+        chunk_words = data.get('words', [])
+        # Keep a space between the last word of one chunk and the first of the next
+        if index > 0 and words and chunk_words:
+            words.append({'text': ' ', 'type': 'spacing', 'start': offset, 'end': offset})
+
+        for word in chunk_words:
+            shifted = dict(word)
+            for key in ('start', 'end'):
+                if shifted.get(key) is not None:
+                    shifted[key] = round(shifted[key] + offset, 3)
+            words.append(shifted)
+
+    merged['text'] = ' '.join(texts)
+    merged['words'] = words
+    return merged
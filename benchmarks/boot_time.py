@@ -0,0 +1,80 @@
+"""Measure worker boot time: importing the app and calling create_app().
+
+Each sample runs in a fresh interpreter, as a new worker would. Also checks
+that importing the app leaves the heavy, first-use-only dependencies
+(yt_dlp, requests) unloaded, and fails when the median import time is over
+budget, so it can guard against regressions in CI:
+
+    python benchmarks/boot_time.py --runs 10 --budget-ms 250
+
+The budget can also be set with BOOT_TIME_BUDGET_MS.
+"""
+import os
+import sys
+import json
+import argparse
+import tempfile
+import statistics
+import subprocess
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+LAZY_MODULES = ('yt_dlp', 'requests')
+
+PROBE = """
+import sys, time, json
+sys.path.insert(0, {repo_dir!r})
+started = time.perf_counter()
+import app
+imported = time.perf_counter()
+app.create_app()
+created = time.perf_counter()
+print(json.dumps({{
+    'import_ms': (imported - started) * 1000,
+    'create_ms': (created - imported) * 1000,
+    'loaded': [name for name in {lazy_modules!r} if name in sys.modules],
+}}))
+"""
+
+
+def boot_once(workdir):
+    probe = PROBE.format(repo_dir=REPO_DIR, lazy_modules=LAZY_MODULES)
+    # A throwaway working directory and job store, so runs don't touch real data
+    env = dict(os.environ, JOB_STORE_URL=f"sqlite:///{os.path.join(workdir, 'jobs.db')}")
+    output = subprocess.run(
+        [sys.executable, '-c', probe], cwd=workdir, env=env, capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--budget-ms', type=float, default=float(os.environ.get('BOOT_TIME_BUDGET_MS', 250)))
+    args = parser.parse_args()
+
+    samples = []
+    with tempfile.TemporaryDirectory() as workdir:
+        for _ in range(args.runs):
+            samples.append(boot_once(workdir))
+
+    import_ms = [sample['import_ms'] for sample in samples]
+    create_ms = [sample['create_ms'] for sample in samples]
+    loaded = sorted({name for sample in samples for name in sample['loaded']})
+
+    print(f"{args.runs} fresh interpreters:")
+    print(f"  import app     median {statistics.median(import_ms):7.1f} ms   max {max(import_ms):7.1f} ms")
+    print(f"  create_app()   median {statistics.median(create_ms):7.1f} ms   max {max(create_ms):7.1f} ms")
+
+    failures = []
+    if loaded:
+        failures.append(f"imported at boot but only needed on first use: {', '.join(loaded)}")
+    if statistics.median(import_ms) > args.budget_ms:
+        failures.append(f"median import time over budget ({args.budget_ms:.0f} ms)")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,262 @@
+"""Offline load test: the app against local stand-ins for YouTube and ElevenLabs.
+
+Starts three servers on 127.0.0.1 in this process:
+
+- a fake media host serving generated audio files, which yt-dlp downloads
+  through its generic extractor (every job gets a distinct file, so the
+  audio and transcription caches don't short-circuit the pipeline);
+- a fake ElevenLabs /v1/speech-to-text with configurable latency and error
+  rate;
+- the app itself (threaded werkzeug server), with its job store and temp
+  files in a throwaway directory;
+
+then runs --users concurrent clients that each repeat /download, polling
+/progress, /get_file, /transcribe and polling /transcription_progress until
+--jobs jobs are done, and reports throughput and p50/p99 latency per route
+and per job. Nothing leaves the machine.
+
+    python benchmarks/load_test.py --users 8 --jobs 64 --stt-latency 0.5 --stt-error-rate 0.05
+
+App settings (DOWNLOAD_WORKERS, TRANSCRIPTION_WORKERS, ELEVENLABS_MAX_RETRIES,
+...) are read from the environment as usual.
+"""
+import os
+import sys
+import json
+import atexit
+import shutil
+import time
+import random
+import logging
+import argparse
+import tempfile
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+import requests  # noqa: E402
+
+
+class MediaHandler(BaseHTTPRequestHandler):
+    """Serves /media/<name>.m4a: deterministic random bytes per name"""
+
+    size = 256 * 1024
+    delay = 0.0
+
+    def _send_headers(self):
+        if not self.path.startswith('/media/'):
+            self.send_error(404)
+            return False
+        self.send_response(200)
+        self.send_header('Content-Type', 'audio/mp4')
+        self.send_header('Content-Length', str(self.size))
+        self.end_headers()
+        return True
+
+    def do_HEAD(self):
+        self._send_headers()
+
+    def do_GET(self):
+        time.sleep(self.delay)
+        if self._send_headers():
+            self.wfile.write(random.Random(self.path).randbytes(self.size))
+
+    def log_message(self, format, *args):
+        pass
+
+
+class SpeechToTextHandler(BaseHTTPRequestHandler):
+    """POST /v1/speech-to-text: waits latency (+-50%), fails with 503 at error_rate, else returns words"""
+
+    latency = 0.5
+    error_rate = 0.0
+    words = 200
+
+    def do_POST(self):
+        # Take the whole upload, as the real API would, before answering
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        time.sleep(self.latency * random.uniform(0.5, 1.5))
+
+        if random.random() < self.error_rate:
+            body = json.dumps({'detail': {'message': 'Simulated outage'}}).encode('utf-8')
+            self.send_response(503)
+        else:
+            words = []
+            for i in range(self.words):
+                words.append({'text': f'word{i % 50}', 'start': i * 0.5, 'end': i * 0.5 + 0.4, 'type': 'word'})
+                words.append({'text': ' ', 'start': i * 0.5 + 0.4, 'end': i * 0.5 + 0.5, 'type': 'spacing'})
+            body = json.dumps({'language_code': 'en', 'text': '', 'words': words}).encode('utf-8')
+            self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(server):
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def start_app(media_url, stt_url):
+    """Import and serve the app from a throwaway working directory; returns its base URL"""
+    workdir = tempfile.mkdtemp(prefix='load-test-')
+    atexit.register(shutil.rmtree, workdir, ignore_errors=True)
+    os.chdir(workdir)
+    os.environ['ELEVENLABS_STT_URL'] = stt_url
+    os.environ.setdefault('JOB_STORE_URL', 'sqlite:///temp_downloads/jobs.db')
+
+    import app as app_module
+    from werkzeug.serving import make_server
+
+    # Retries and failures show up in the report; keep the app's log to errors
+    logging.getLogger().setLevel(logging.ERROR)
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+
+    # The app only takes YouTube URLs; let it take the fake media host's as well
+    is_valid_youtube_url = app_module.is_valid_youtube_url
+    app_module.is_valid_youtube_url = lambda url: url.startswith(media_url) or is_valid_youtube_url(url)
+
+    server = make_server('127.0.0.1', 0, app_module.create_app(), threaded=True)
+    return serve(server)
+
+
+class Recorder:
+    """Thread-safe latency samples per label, plus error counts"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.samples = {}
+        self.errors = {}
+
+    def add(self, label, seconds, error=False):
+        with self._lock:
+            self.samples.setdefault(label, []).append(seconds)
+            if error:
+                self.errors[label] = self.errors.get(label, 0) + 1
+
+    def timed(self, label, session, method, url, **kwargs):
+        started = time.perf_counter()
+        response = session.request(method, url, **kwargs)
+        # Read streamed bodies (audio) completely before stopping the clock
+        _ = response.content
+        self.add(label, time.perf_counter() - started, error=response.status_code >= 400)
+        return response
+
+
+def run_job(index, app_url, media_url, recorder, args):
+    """One client session: download, fetch the file, transcribe; returns (downloaded, transcribed)"""
+    session = requests.Session()
+    started = time.perf_counter()
+    response = recorder.timed('POST /download', session, 'POST', f"{app_url}/download",
+                              data={'youtube_url': f"{media_url}/media/clip-{index:06d}.m4a"})
+    if response.status_code != 200:
+        return False, False
+    download_id = response.json()['download_id']
+
+    while True:
+        progress = recorder.timed('GET /progress', session, 'GET', f"{app_url}/progress/{download_id}").json()
+        if progress.get('finished'):
+            break
+        time.sleep(args.poll_interval)
+    recorder.add('job: download', time.perf_counter() - started, error=progress['status'] != 'success')
+    if progress['status'] != 'success':
+        return False, False
+
+    recorder.timed('GET /get_file', session, 'GET', f"{app_url}/get_file/{download_id}")
+    if args.skip_transcribe:
+        return True, False
+
+    started = time.perf_counter()
+    response = recorder.timed('POST /transcribe', session, 'POST', f"{app_url}/transcribe/{download_id}",
+                              data={'api_key': 'load-test'})
+    if response.status_code != 200:
+        return True, False
+    job_id = response.json()['job_id']
+
+    while True:
+        progress = recorder.timed('GET /transcription_progress', session, 'GET',
+                                  f"{app_url}/transcription_progress/{job_id}").json()
+        if progress.get('finished'):
+            break
+        time.sleep(args.poll_interval)
+    recorder.add('job: transcription', time.perf_counter() - started, error=progress['status'] != 'success')
+    return True, progress['status'] == 'success'
+
+
+def percentile(samples, q):
+    return samples[min(len(samples) - 1, int(len(samples) * q))]
+
+
+def report(recorder, elapsed, args, downloaded, transcribed):
+    print(f"{args.jobs} jobs, {args.users} users in {elapsed:.1f} s: {args.jobs / elapsed:.2f} jobs/s "
+          f"({downloaded} downloaded, {transcribed} transcribed)")
+    print(f"  media {args.media_kib} KiB (+{args.media_delay * 1000:.0f} ms), "
+          f"STT latency {args.stt_latency * 1000:.0f} ms +-50%, STT error rate {args.stt_error_rate:.0%}")
+    print()
+    print(f"  {'':32} {'count':>7} {'errors':>7} {'per s':>7} {'p50 ms':>9} {'p99 ms':>9}")
+    for label, samples in sorted(recorder.samples.items(), key=lambda item: item[0].startswith('job')):
+        samples = sorted(samples)
+        print(f"  {label:32} {len(samples):7} {recorder.errors.get(label, 0):7} {len(samples) / elapsed:7.1f}"
+              f" {percentile(samples, 0.5) * 1000:9.1f} {percentile(samples, 0.99) * 1000:9.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--users', type=int, default=8, help='concurrent clients')
+    parser.add_argument('--jobs', type=int, default=32, help='download (+ transcription) jobs in total')
+    parser.add_argument('--media-kib', type=int, default=256, help='size of each fake audio file')
+    parser.add_argument('--media-delay', type=float, default=0.0, help='seconds before the media host answers')
+    parser.add_argument('--stt-latency', type=float, default=0.5, help='mean seconds per fake STT request')
+    parser.add_argument('--stt-error-rate', type=float, default=0.0, help='share of STT requests failing with 503')
+    parser.add_argument('--stt-words', type=int, default=200, help='words in each fake transcript')
+    parser.add_argument('--poll-interval', type=float, default=0.1, help='seconds between progress polls')
+    parser.add_argument('--skip-transcribe', action='store_true', help='only download and fetch files')
+    args = parser.parse_args()
+
+    MediaHandler.size = args.media_kib * 1024
+    MediaHandler.delay = args.media_delay
+    SpeechToTextHandler.latency = args.stt_latency
+    SpeechToTextHandler.error_rate = args.stt_error_rate
+    SpeechToTextHandler.words = args.stt_words
+
+    media_url = serve(ThreadingHTTPServer(('127.0.0.1', 0), MediaHandler))
+    stt_url = serve(ThreadingHTTPServer(('127.0.0.1', 0), SpeechToTextHandler)) + '/v1/speech-to-text'
+    app_url = start_app(media_url, stt_url)
+
+    recorder = Recorder()
+    next_job = iter(range(args.jobs))
+    next_job_lock = threading.Lock()
+    totals = {'downloaded': 0, 'transcribed': 0}
+
+    def user():
+        while True:
+            with next_job_lock:
+                index = next(next_job, None)
+            if index is None:
+                return
+            try:
+                downloaded, transcribed = run_job(index, app_url, media_url, recorder, args)
+            except requests.RequestException as e:
+                print(f"job {index}: {str(e)}", file=sys.stderr)
+                continue
+            with next_job_lock:
+                totals['downloaded'] += downloaded
+                totals['transcribed'] += transcribed
+
+    started = time.perf_counter()
+    users = [threading.Thread(target=user) for _ in range(args.users)]
+    for thread in users:
+        thread.start()
+    for thread in users:
+        thread.join()
+    report(recorder, time.perf_counter() - started, args, totals['downloaded'], totals['transcribed'])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,127 @@
+"""Benchmark the single-pass transcript renderer against the old per-format functions.
+
+Builds synthetic ElevenLabs-style transcriptions (words interleaved with
+spacing entries, occasional punctuation) and times rendering SRT and TXT
+the old way (two separate walks, SRT built with repeated ``+=``) against
+rendering SRT, WebVTT, TXT and JSON in one pass. Also checks that the new
+SRT and TXT output is byte-for-byte identical to the old one.
+
+    python benchmarks/transcript_render_bench.py --words 50000 --repeat 5
+"""
+import os
+import sys
+import time
+import random
+import argparse
+from datetime import timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from transcript_render import render_transcript_strings  # noqa: E402
+
+VOCABULARY = ['the', 'audio', 'video', 'we', 'transcribe', 'download', 'and', 'then',
+              'subtitle', 'every', 'word', 'here', 'is', 'a', 'long', 'sentence']
+
+
+def synthetic_transcription(word_count, seed=0):
+    """ElevenLabs-shaped transcription data with word_count words"""
+    rng = random.Random(seed)
+    words = []
+    position = 0.0
+    for index in range(word_count):
+        text = rng.choice(VOCABULARY)
+        if rng.random() < 0.08:
+            text += rng.choice('.,?!')
+        duration = rng.uniform(0.1, 0.6)
+        words.append({'text': text, 'type': 'word', 'start': round(position, 3),
+                      'end': round(position + duration, 3), 'speaker_id': f'speaker_{index // 500 % 2}'})
+        position += duration
+        words.append({'text': ' ', 'type': 'spacing', 'start': round(position, 3), 'end': round(position, 3)})
+        position += rng.uniform(0.0, 0.2)
+    return {'language_code': 'en', 'text': '', 'words': words}
+
+
+# The renderers this benchmark replaced, kept verbatim as the baseline
+def legacy_format_time(seconds):
+    td = timedelta(seconds=seconds)
+    hours, remainder = divmod(td.seconds, 3600)
+    minutes, seconds = divmod(remainder, 60)
+    milliseconds = td.microseconds // 1000
+    return f"{hours:02}:{minutes:02}:{seconds:02},{milliseconds:03}"
+
+
+def legacy_extract_plain_text(transcription_data):
+    words = [w for w in transcription_data.get('words', []) if w.get('type') == 'word']
+    paragraphs = []
+    for i in range(0, len(words), 10):
+        group = words[i:i+10]
+        if not group:
+            continue
+        text_parts = []
+        for j, word in enumerate(group):
+            word_text = word.get('text', '')
+            if j > 0 and not word_text.startswith((' ', '.', ',', '!', '?', ':', ';')):
+                text_parts.append(' ')
+            text_parts.append(word_text)
+        paragraphs.append("".join(text_parts).strip())
+    return "\n\n".join(paragraphs)
+
+
+def legacy_create_srt_content(transcription_data):
+    srt_content = ""
+    subtitle_index = 1
+    words = [w for w in transcription_data.get('words', []) if w.get('type') == 'word']
+    for i in range(0, len(words), 10):
+        group = words[i:i+10]
+        if not group:
+            continue
+        start_time = group[0].get('start', 0)
+        end_time = group[-1].get('end', start_time + 2)
+        text_parts = []
+        for j, word in enumerate(group):
+            word_text = word.get('text', '')
+            if j > 0 and not word_text.startswith((' ', '.', ',', '!', '?', ':', ';')):
+                text_parts.append(' ')
+            text_parts.append(word_text)
+        text = "".join(text_parts)
+        srt_content += f"{subtitle_index}\n"
+        srt_content += f"{legacy_format_time(start_time)} --> {legacy_format_time(end_time)}\n"
+        srt_content += f"{text.strip()}\n\n"
+        subtitle_index += 1
+    return srt_content
+
+
+def best_of(repeat, func, *args):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func(*args)
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--words', type=int, nargs='+', default=[5000, 50000])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    for word_count in args.words:
+        data = synthetic_transcription(word_count)
+
+        rendered = render_transcript_strings(data)
+        assert rendered['srt'] == legacy_create_srt_content(data), 'SRT output differs from the legacy renderer'
+        assert rendered['txt'] == legacy_extract_plain_text(data), 'TXT output differs from the legacy renderer'
+
+        legacy = best_of(args.repeat, lambda: (legacy_create_srt_content(data), legacy_extract_plain_text(data)))
+        srt_txt = best_of(args.repeat, render_transcript_strings, data, ('srt', 'txt'))
+        all_formats = best_of(args.repeat, render_transcript_strings, data)
+
+        print(f"{word_count} words:")
+        print(f"  legacy SRT + TXT (two passes)      {legacy * 1000:8.1f} ms")
+        print(f"  single pass SRT + TXT              {srt_txt * 1000:8.1f} ms  ({legacy / srt_txt:.1f}x)")
+        print(f"  single pass SRT + VTT + TXT + JSON {all_formats * 1000:8.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+"""Benchmark per-job yt-dlp setup: a fresh YoutubeDL per job versus the warm pool.
+
+Times what a job pays before any network request: building the
+YoutubeDL (option parsing, extractor registry, postprocessors) and
+resolving and instantiating the extractor for the URL, which is what
+extract_info does first. Network-dependent state that a warm instance also
+keeps (e.g. the YouTube extractor's cached player code) is not measured,
+so the real saving per job is larger than reported here.
+
+    python benchmarks/ydl_setup_bench.py --jobs 200
+"""
+import os
+import sys
+import time
+import argparse
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import yt_dlp  # noqa: E402
+from ydl_pool import YoutubeDLPool, QuietYDLLogger  # noqa: E402
+
+URL = 'https://www.youtube.com/watch?v=dQw4w9WgXcQ'
+
+PARAMS = {
+    'format': 'bestaudio/best',
+    'playlist_items': '1',
+    'quiet': True,
+    'no_warnings': True,
+    'logger': QuietYDLLogger(),
+    'outtmpl': os.path.join('temp_downloads', 'audio_cache', '%(id)s', '%(id)s.%(ext)s'),
+}
+
+
+def resolve_extractor(ydl, url):
+    """The extractor lookup extract_info performs before touching the network"""
+    for key, ie in ydl._ies.items():
+        if ie.suitable(url):
+            return ydl.get_info_extractor(key)
+    return None
+
+
+def fresh_instance_job(progress_hook):
+    with yt_dlp.YoutubeDL({**PARAMS, 'progress_hooks': [progress_hook]}) as ydl:
+        resolve_extractor(ydl, URL)
+
+
+def pooled_job(pool, job_id):
+    with pool.job(job_id) as ydl:
+        resolve_extractor(ydl, URL)
+
+
+def timings(jobs, func, *args):
+    samples = []
+    for _ in range(jobs):
+        started = time.perf_counter()
+        func(*args)
+        samples.append((time.perf_counter() - started) * 1000)
+    return samples
+
+
+def report(label, samples):
+    samples = sorted(samples)
+    p99 = samples[min(len(samples) - 1, int(len(samples) * 0.99))]
+    print(f"  {label:28} mean {statistics.mean(samples):7.2f} ms   p50 {statistics.median(samples):7.2f} ms"
+          f"   p99 {p99:7.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--jobs', type=int, default=200)
+    args = parser.parse_args()
+
+    def progress_hook(status):
+        pass
+
+    # Pay one-time import and regex compilation costs before measuring either side
+    fresh_instance_job(progress_hook)
+
+    pool = YoutubeDLPool(PARAMS, size=4, progress_callback=lambda job_id, status: None)
+    first = timings(1, pooled_job, pool, 'warmup')
+
+    print(f"{args.jobs} jobs:")
+    report('fresh YoutubeDL per job', timings(args.jobs, fresh_instance_job, progress_hook))
+    report('pool (first, cold instance)', first)
+    report('pool (warm instance)', timings(args.jobs, pooled_job, pool, 'job'))
+
+
+if __name__ == '__main__':
+    main()
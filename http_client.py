@@ -0,0 +1,209 @@
+import time
+import random
+import logging
+import threading
+from email.utils import parsedate_to_datetime
+
+logger = logging.getLogger(__name__)
+
+# Methods safe to resend after the server may already have acted on the request
+IDEMPOTENT_METHODS = frozenset(('GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE', 'TRACE'))
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of sending a request while the circuit breaker is open"""
+
+
+class CircuitBreaker:
+    """Stops calling a failing service for a while after repeated failures.
+
+    After ``failure_threshold`` consecutive failures the breaker opens and
+    every call fails fast for ``reset_timeout`` seconds. Then a single trial
+    call is let through (half-open): success closes the breaker again,
+    failure re-opens it.
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at = None
+        self._trial_in_flight = False
+
+    @property
+    def state(self):
+        with self._lock:
+            if self._opened_at is None:
+                return 'closed'
+            if time.monotonic() - self._opened_at >= self.reset_timeout:
+                return 'half_open'
+            return 'open'
+
+    def allow(self):
+        """Whether a call may be attempted now"""
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if time.monotonic() - self._opened_at < self.reset_timeout or self._trial_in_flight:
+                return False
+            self._trial_in_flight = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_in_flight = False
+
+    def release(self):
+        """End a call that says nothing about the service's health (e.g. it failed locally)"""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._trial_in_flight = False
+            if self._opened_at is not None or self._failures >= self.failure_threshold:
+                if self._opened_at is None:
+                    logger.warning(f"Circuit breaker opened after {self._failures} consecutive failures")
+                self._opened_at = time.monotonic()
+
+
+class ResilientClient:
+    """Pooled HTTP client with timeouts, retries with jittered backoff and a circuit breaker.
+
+    One ``requests.Session`` is shared so TLS connections are reused across
+    calls; it is created on the first request, so constructing a client at
+    import doesn't load requests. Connection errors, timeouts and the
+    statuses in ``retry_statuses`` are retried with exponential backoff and
+    full jitter, honouring ``Retry-After``; read timeouts are not retried
+    for non-idempotent methods, since the server may still be processing
+    (and billing) the request. File objects in ``files`` are rewound before
+    every attempt so uploads can be resent.
+
+    ``on_attempt(outcome, seconds)`` is called after every attempt with the
+    response status code, or the exception's class name if none came back.
+    """
+
+    def __init__(self, timeout=(10, 600), max_retries=3, backoff_base=1.0, backoff_max=30.0,
+                 retry_statuses=(429, 500, 502, 503, 504), pool_size=10, breaker=None, on_attempt=None):
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.retry_statuses = set(retry_statuses)
+        self.breaker = breaker or CircuitBreaker()
+        self.pool_size = pool_size
+        self.on_attempt = on_attempt
+        self._session = None
+        self._session_lock = threading.Lock()
+
+    @property
+    def session(self):
+        with self._session_lock:
+            if self._session is None:
+                import requests
+                from requests.adapters import HTTPAdapter
+
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size)
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                self._session = session
+            return self._session
+
+    def _retry_after(self, response):
+        """Seconds the server asked us to wait, or None"""
+        value = response.headers.get('Retry-After')
+        if not value:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+        try:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return None
+
+    def _backoff(self, attempt):
+        # Full jitter: uniform in [0, min(max, base * 2^attempt)]
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    @staticmethod
+    def _rewind(files):
+        for value in (files or {}).values():
+            if isinstance(value, tuple) and len(value) > 1 and hasattr(value[1], 'seek'):
+                value[1].seek(0)
+            elif hasattr(value, 'seek'):
+                value.seek(0)
+
+    def request(self, method, url, **kwargs):
+        """Send a request, retrying transient failures; returns the final response"""
+        import requests
+
+        kwargs.setdefault('timeout', self.timeout)
+
+        attempt = 0
+        while True:
+            if not self.breaker.allow():
+                raise CircuitOpenError(f"Circuit open for {url}, not sending request")
+
+            self._rewind(kwargs.get('files'))
+            started = time.monotonic()
+            try:
+                response = self.session.request(method, url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                self._report(type(e).__name__, started)
+                self.breaker.record_failure()
+                if attempt >= self.max_retries or not self._retryable(method, e):
+                    raise
+                delay = self._backoff(attempt)
+                logger.warning(f"{method} {url} failed ({str(e)}), retrying in {delay:.1f}s")
+            except Exception as e:
+                # Anything else (bad URL, unreadable upload) is our own fault; just free the trial slot
+                self._report(type(e).__name__, started)
+                self.breaker.release()
+                raise
+            else:
+                self._report(response.status_code, started)
+                if response.status_code not in self.retry_statuses:
+                    # Client errors (bad key, bad file) say nothing about the service's health
+                    self.breaker.record_success()
+                    return response
+
+                # Rate limiting is per API key, not a sign the service is down
+                if response.status_code != 429:
+                    self.breaker.record_failure()
+                else:
+                    self.breaker.record_success()
+
+                if attempt >= self.max_retries:
+                    return response
+
+                retry_after = self._retry_after(response)
+                delay = min(self.backoff_max, retry_after) if retry_after is not None else self._backoff(attempt)
+                logger.warning(f"{method} {url} returned {response.status_code}, retrying in {delay:.1f}s")
+
+            attempt += 1
+            time.sleep(delay)
+
+    @staticmethod
+    def _retryable(method, error):
+        import requests
+
+        # A read timeout means the request went out; resending may do the work twice
+        return not isinstance(error, requests.ReadTimeout) or method.upper() in IDEMPOTENT_METHODS
+
+    def _report(self, outcome, started):
+        if self.on_attempt is None:
+            return
+        try:
+            self.on_attempt(outcome, time.monotonic() - started)
+        except Exception as e:
+            logger.error(f"Error reporting request attempt: {str(e)}")
+
+    def post(self, url, **kwargs):
+        return self.request('POST', url, **kwargs)
@@ -0,0 +1,184 @@
+import heapq
+import itertools
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+
+class QueueFullError(Exception):
+    """Raised when a job is submitted to a scheduler whose queue is full"""
+
+
+class JobScheduler:
+    """Bounded worker pool with a priority queue and per-stage concurrency limits.
+
+    Jobs are run by a fixed number of worker threads in priority order
+    (lower first), FIFO within the same priority. Inside a job, ``stage()``
+    limits how many jobs may be in a given stage at once, e.g. how many
+    ffmpeg processes run concurrently regardless of the pool size.
+
+    ``on_state_change(job_id, status)`` is called whenever a job's state
+    changes (``status`` is None once the job is done), so the state can be
+    published somewhere other processes can read it. ``on_state_time(job_id,
+    state, seconds)`` is called as a job leaves each state ('queued',
+    'running', a stage or 'waiting_<stage>') with the time it spent there.
+
+    ``submit(..., max_queued=n)`` admits a job only while fewer than ``n``
+    jobs are queued, so bulk work can be held below the scheduler-wide
+    bound and leave the remaining capacity to interactive jobs.
+    """
+
+    def __init__(self, name, workers, stage_limits=None, max_queued=None, on_state_change=None,
+                 on_state_time=None):
+        self.name = name
+        self.workers = max(1, int(workers))
+        self.max_queued = max_queued
+        self.on_state_change = on_state_change
+        self.on_state_time = on_state_time
+        self._cond = threading.Condition()
+        self._queue = []
+        self._counter = itertools.count()
+        self._jobs = {}
+        self._threads = []
+        self._stage_limits = dict(stage_limits or {})
+        self._stage_semaphores = {
+            stage: threading.BoundedSemaphore(max(1, int(limit)))
+            for stage, limit in self._stage_limits.items()
+        }
+
+    def _ensure_workers(self):
+        # Called with self._cond held; workers are started on first use so
+        # importing the app doesn't spin up threads
+        while len(self._threads) < self.workers:
+            thread = threading.Thread(
+                target=self._worker,
+                name=f"{self.name}-worker-{len(self._threads)}",
+                daemon=True
+            )
+            self._threads.append(thread)
+            thread.start()
+
+    def submit(self, job_id, func, *args, priority=0, max_queued=None, **kwargs):
+        """Queue func(*args, **kwargs) to run as job_id, optionally under a tighter queue bound"""
+        limits = [limit for limit in (self.max_queued, max_queued) if limit is not None]
+        with self._cond:
+            if limits and len(self._queue) >= min(limits):
+                raise QueueFullError(f"{self.name} queue is full ({min(limits)} jobs waiting)")
+
+            entry = (priority, next(self._counter), job_id, func, args, kwargs)
+            heapq.heappush(self._queue, entry)
+            self._jobs[job_id] = {'state': 'queued', 'sort_key': entry[:2], 'since': time.monotonic()}
+            self._ensure_workers()
+            self._cond.notify()
+
+        self._publish(job_id)
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                while not self._queue:
+                    self._cond.wait()
+                _, _, job_id, func, args, kwargs = heapq.heappop(self._queue)
+                timing = self._leave_state(job_id)
+                self._jobs[job_id] = {'state': 'running', 'sort_key': None, 'since': time.monotonic()}
+
+            self._report_time(job_id, timing)
+            self._publish(job_id)
+            try:
+                func(*args, **kwargs)
+            except Exception as e:
+                logger.error(f"Unhandled error in {self.name} job {job_id}: {str(e)}")
+            finally:
+                with self._cond:
+                    timing = self._leave_state(job_id)
+                    self._jobs.pop(job_id, None)
+                self._report_time(job_id, timing)
+                self._publish(job_id)
+
+    def _publish(self, job_id):
+        if self.on_state_change is None:
+            return
+        try:
+            self.on_state_change(job_id, self.status(job_id))
+        except Exception as e:
+            logger.error(f"Error publishing state of {self.name} job {job_id}: {str(e)}")
+
+    def _leave_state(self, job_id):
+        # Called with self._cond held; the state the job is leaving and how long it was in it
+        job = self._jobs.get(job_id)
+        if job is None:
+            return None
+        now = time.monotonic()
+        timing = (job['state'], now - job['since'])
+        job['since'] = now
+        return timing
+
+    def _report_time(self, job_id, timing):
+        if self.on_state_time is None or timing is None:
+            return
+        try:
+            self.on_state_time(job_id, *timing)
+        except Exception as e:
+            logger.error(f"Error reporting timing of {self.name} job {job_id}: {str(e)}")
+
+    def _set_state(self, job_id, state):
+        """Move a job to a new state; returns the state it left (None if it isn't running here)"""
+        with self._cond:
+            if job_id not in self._jobs:
+                return None
+            timing = self._leave_state(job_id)
+            self._jobs[job_id]['state'] = state
+        self._report_time(job_id, timing)
+        self._publish(job_id)
+        return timing[0]
+
+    @contextmanager
+    def stage(self, job_id, stage):
+        """Run the enclosed block as a named stage of a job, honouring its concurrency limit"""
+        semaphore = self._stage_semaphores.get(stage)
+        previous = None
+        try:
+            if semaphore is None:
+                previous = self._set_state(job_id, stage)
+                yield
+                return
+
+            previous = self._set_state(job_id, f"waiting_{stage}")
+            with semaphore:
+                self._set_state(job_id, stage)
+                yield
+        finally:
+            # Stages can nest (e.g. postprocessing inside a download); go back to the enclosing one
+            if previous is not None:
+                self._set_state(job_id, previous)
+
+    def status(self, job_id):
+        """State and queue position of a job, or None once it has finished"""
+        with self._cond:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+
+            status = {'state': job['state'], 'queue_position': None}
+            if job['state'] == 'queued':
+                # 1-based position among the jobs that will run before this one
+                status['queue_position'] = 1 + sum(
+                    1 for entry in self._queue if entry[:2] < job['sort_key']
+                )
+            return status
+
+    def stats(self):
+        """Snapshot of queue depth and per-state job counts"""
+        with self._cond:
+            states = {}
+            for job in self._jobs.values():
+                states[job['state']] = states.get(job['state'], 0) + 1
+            return {
+                'workers': self.workers,
+                'queued': len(self._queue),
+                'states': states,
+                'stage_limits': dict(self._stage_limits)
+            }
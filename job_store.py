@@ -0,0 +1,442 @@
+import os
+import json
+import time
+import logging
+import sqlite3
+import threading
+from collections.abc import MutableMapping
+
+logger = logging.getLogger(__name__)
+
+
+class JobStore:
+    """Key/value storage for job state, partitioned into namespaces.
+
+    Every value is a JSON-serializable object stored under
+    ``(namespace, job_id)``. Writes are durable as soon as they return for
+    backends with ``persistent = True``; the database backends additionally
+    let every gunicorn worker see the same jobs.
+    """
+
+    persistent = False
+
+    def get(self, namespace, job_id, default=None):
+        raise NotImplementedError
+
+    def set(self, namespace, job_id, value):
+        raise NotImplementedError
+
+    def delete(self, namespace, job_id):
+        raise NotImplementedError
+
+    def keys(self, namespace):
+        raise NotImplementedError
+
+    def items(self, namespace):
+        raise NotImplementedError
+
+    def items_since(self, namespace, since):
+        """[(job_id, value, updated_at)] for entries written at or after since (a time.time() value)"""
+        raise NotImplementedError
+
+    def contains(self, namespace, job_id):
+        return self.get(namespace, job_id) is not None
+
+    def count(self, namespace):
+        return len(self.keys(namespace))
+
+    def mapping(self, namespace):
+        """Dict-like view over one namespace"""
+        return StoreMapping(self, namespace)
+
+
+class StoreMapping(MutableMapping):
+    """Dict-like view over one namespace of a JobStore.
+
+    Values are returned as copies for the shared backends, so nested changes
+    must be written back with ``mapping[key] = value``.
+    """
+
+    def __init__(self, store, namespace):
+        self.store = store
+        self.namespace = namespace
+
+    def __getitem__(self, job_id):
+        value = self.store.get(self.namespace, job_id)
+        if value is None:
+            raise KeyError(job_id)
+        return value
+
+    def get(self, job_id, default=None):
+        value = self.store.get(self.namespace, job_id)
+        return default if value is None else value
+
+    def __setitem__(self, job_id, value):
+        self.store.set(self.namespace, job_id, value)
+
+    def __delitem__(self, job_id):
+        if not self.store.delete(self.namespace, job_id):
+            raise KeyError(job_id)
+
+    def __contains__(self, job_id):
+        return self.store.contains(self.namespace, job_id)
+
+    def __iter__(self):
+        return iter(self.store.keys(self.namespace))
+
+    def __len__(self):
+        return self.store.count(self.namespace)
+
+    def items(self):
+        return self.store.items(self.namespace)
+
+    def values(self):
+        return [value for _, value in self.store.items(self.namespace)]
+
+    def items_since(self, since):
+        return self.store.items_since(self.namespace, since)
+
+
+class MemoryJobStore(JobStore):
+    """Per-process dictionaries; only correct with a single worker process and nothing survives a restart"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._data = {}
+        # Write times per entry; entries loaded some other way count as written at 0
+        self._updated = {}
+
+    def get(self, namespace, job_id, default=None):
+        return self._data.get(namespace, {}).get(job_id, default)
+
+    def set(self, namespace, job_id, value):
+        with self._lock:
+            self._data.setdefault(namespace, {})[job_id] = value
+            self._updated.setdefault(namespace, {})[job_id] = time.time()
+
+    def delete(self, namespace, job_id):
+        with self._lock:
+            self._updated.get(namespace, {}).pop(job_id, None)
+            return self._data.get(namespace, {}).pop(job_id, None) is not None
+
+    def contains(self, namespace, job_id):
+        return job_id in self._data.get(namespace, {})
+
+    def keys(self, namespace):
+        with self._lock:
+            return list(self._data.get(namespace, {}))
+
+    def items(self, namespace):
+        with self._lock:
+            return list(self._data.get(namespace, {}).items())
+
+    def items_since(self, namespace, since):
+        with self._lock:
+            updated = self._updated.get(namespace, {})
+            return [
+                (job_id, value, updated.get(job_id, 0.0))
+                for job_id, value in self._data.get(namespace, {}).items()
+                if updated.get(job_id, 0.0) >= since
+            ]
+
+    def count(self, namespace):
+        return len(self._data.get(namespace, {}))
+
+
+class JournaledJobStore(MemoryJobStore):
+    """Per-process dictionaries made durable by an append-only journal.
+
+    Each change to a journaled namespace appends one JSON line to
+    ``<base>.journal``, so persisting costs O(change) rather than rewriting
+    the whole history. Once the journal grows well past the number of live
+    entries it is compacted into ``<base>.snapshot.json``. On startup the
+    snapshot is loaded and the journal replayed on top of it. Like the
+    plain memory store, it is only correct with a single worker process.
+    """
+
+    persistent = True
+
+    def __init__(self, base_path, namespaces=('results', 'last_served'), compact_min_records=1000, compact_ratio=4):
+        super().__init__()
+        self.snapshot_path = f"{base_path}.snapshot.json"
+        self.journal_path = f"{base_path}.journal"
+        self.namespaces = set(namespaces)
+        self.compact_min_records = compact_min_records
+        self.compact_ratio = compact_ratio
+        directory = os.path.dirname(base_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._journal_records = self._replay()
+        self._journal = open(self.journal_path, 'a', encoding='utf-8')
+
+    def _replay(self):
+        if os.path.exists(self.snapshot_path):
+            with open(self.snapshot_path, 'r', encoding='utf-8') as f:
+                self._data = json.load(f)
+
+        records = 0
+        if os.path.exists(self.journal_path):
+            with open(self.journal_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        # A torn final line from a crash mid-append; everything before it is intact
+                        logger.warning(f"Ignoring unreadable journal record in {self.journal_path}")
+                        continue
+                    namespace = self._data.setdefault(record['ns'], {})
+                    if record['op'] == 'set':
+                        namespace[record['id']] = record['value']
+                    else:
+                        namespace.pop(record['id'], None)
+                    records += 1
+        return records
+
+    def _append(self, record):
+        # Called with self._lock held
+        self._journal.write(json.dumps(record, ensure_ascii=False) + '\n')
+        self._journal.flush()
+        self._journal_records += 1
+
+        live = sum(len(self._data.get(namespace, {})) for namespace in self.namespaces)
+        if self._journal_records > max(self.compact_min_records, self.compact_ratio * live):
+            self._compact()
+
+    def _compact(self):
+        # Called with self._lock held: snapshot the journaled namespaces, then start a fresh journal.
+        # Replaying the old journal over the new snapshot is harmless, so a crash in between is safe.
+        snapshot = {namespace: self._data.get(namespace, {}) for namespace in self.namespaces}
+        tmp_path = f"{self.snapshot_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(snapshot, f, ensure_ascii=False)
+        os.replace(tmp_path, self.snapshot_path)
+
+        self._journal.close()
+        self._journal = open(self.journal_path, 'w', encoding='utf-8')
+        logger.debug(f"Compacted job journal after {self._journal_records} records")
+        self._journal_records = 0
+
+    def set(self, namespace, job_id, value):
+        with self._lock:
+            self._data.setdefault(namespace, {})[job_id] = value
+            self._updated.setdefault(namespace, {})[job_id] = time.time()
+            if namespace in self.namespaces:
+                self._append({'op': 'set', 'ns': namespace, 'id': job_id, 'value': value})
+
+    def delete(self, namespace, job_id):
+        with self._lock:
+            self._updated.get(namespace, {}).pop(job_id, None)
+            found = self._data.get(namespace, {}).pop(job_id, None) is not None
+            if found and namespace in self.namespaces:
+                self._append({'op': 'delete', 'ns': namespace, 'id': job_id})
+            return found
+
+
+class SQLiteJobStore(JobStore):
+    """SQLite database in WAL mode, shared by every worker process on the host"""
+
+    persistent = True
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        # The database is opened and its schema created on first use, not at import time
+        self._schema_lock = threading.Lock()
+        self._schema_ready = False
+
+    def _ensure_schema(self):
+        with self._schema_lock:
+            if self._schema_ready:
+                return
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            try:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS job_state ("
+                    " namespace TEXT NOT NULL,"
+                    " job_id TEXT NOT NULL,"
+                    " value TEXT NOT NULL,"
+                    " updated_at REAL NOT NULL,"
+                    " PRIMARY KEY (namespace, job_id))"
+                )
+                conn.execute("CREATE INDEX IF NOT EXISTS job_state_updated ON job_state (namespace, updated_at)")
+            finally:
+                conn.close()
+            self._schema_ready = True
+
+    def _conn(self):
+        # sqlite3 connections can't be shared between threads, so keep one per thread
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            if not self._schema_ready:
+                self._ensure_schema()
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=30000")
+            self._local.conn = conn
+        return conn
+
+    def get(self, namespace, job_id, default=None):
+        row = self._conn().execute(
+            "SELECT value FROM job_state WHERE namespace = ? AND job_id = ?",
+            (namespace, job_id)
+        ).fetchone()
+        return json.loads(row[0]) if row else default
+
+    def set(self, namespace, job_id, value):
+        self._conn().execute(
+            "INSERT INTO job_state (namespace, job_id, value, updated_at) VALUES (?, ?, ?, ?)"
+            " ON CONFLICT(namespace, job_id) DO UPDATE SET value = excluded.value, updated_at = excluded.updated_at",
+            (namespace, job_id, json.dumps(value, ensure_ascii=False), time.time())
+        )
+
+    def delete(self, namespace, job_id):
+        cursor = self._conn().execute(
+            "DELETE FROM job_state WHERE namespace = ? AND job_id = ?",
+            (namespace, job_id)
+        )
+        return cursor.rowcount > 0
+
+    def contains(self, namespace, job_id):
+        return self._conn().execute(
+            "SELECT 1 FROM job_state WHERE namespace = ? AND job_id = ?",
+            (namespace, job_id)
+        ).fetchone() is not None
+
+    def keys(self, namespace):
+        rows = self._conn().execute(
+            "SELECT job_id FROM job_state WHERE namespace = ?", (namespace,)
+        ).fetchall()
+        return [row[0] for row in rows]
+
+    def items(self, namespace):
+        rows = self._conn().execute(
+            "SELECT job_id, value FROM job_state WHERE namespace = ?", (namespace,)
+        ).fetchall()
+        return [(row[0], json.loads(row[1])) for row in rows]
+
+    def items_since(self, namespace, since):
+        rows = self._conn().execute(
+            "SELECT job_id, value, updated_at FROM job_state WHERE namespace = ? AND updated_at >= ?",
+            (namespace, since)
+        ).fetchall()
+        return [(row[0], json.loads(row[1]), row[2]) for row in rows]
+
+    def count(self, namespace):
+        return self._conn().execute(
+            "SELECT COUNT(*) FROM job_state WHERE namespace = ?", (namespace,)
+        ).fetchone()[0]
+
+
+class SQLAlchemyJobStore(JobStore):
+    """PostgreSQL (or any SQLAlchemy URL supporting ON CONFLICT upserts), shared across hosts"""
+
+    persistent = True
+
+    def __init__(self, url):
+        # Imported lazily so SQLAlchemy is only needed when this backend is configured
+        from sqlalchemy import create_engine, text
+
+        # Heroku/Replit style URLs use the scheme SQLAlchemy 1.4+ no longer accepts
+        if url.startswith('postgres://'):
+            url = 'postgresql://' + url[len('postgres://'):]
+
+        self._text = text
+        # create_engine doesn't connect; the schema is created on first use
+        self.engine = create_engine(url, pool_pre_ping=True)
+        self._schema_lock = threading.Lock()
+        self._schema_ready = False
+
+    def _ensure_schema(self):
+        with self._schema_lock:
+            if self._schema_ready:
+                return
+            with self.engine.begin() as conn:
+                conn.execute(self._text(
+                    "CREATE TABLE IF NOT EXISTS job_state ("
+                    " namespace VARCHAR(64) NOT NULL,"
+                    " job_id VARCHAR(255) NOT NULL,"
+                    " value TEXT NOT NULL,"
+                    " updated_at DOUBLE PRECISION NOT NULL,"
+                    " PRIMARY KEY (namespace, job_id))"
+                ))
+                conn.execute(self._text(
+                    "CREATE INDEX IF NOT EXISTS job_state_updated ON job_state (namespace, updated_at)"
+                ))
+            self._schema_ready = True
+
+    def _execute(self, sql, **params):
+        if not self._schema_ready:
+            self._ensure_schema()
+        with self.engine.begin() as conn:
+            return conn.execute(self._text(sql), params)
+
+    def get(self, namespace, job_id, default=None):
+        row = self._execute(
+            "SELECT value FROM job_state WHERE namespace = :namespace AND job_id = :job_id",
+            namespace=namespace, job_id=job_id
+        ).fetchone()
+        return json.loads(row[0]) if row else default
+
+    def set(self, namespace, job_id, value):
+        self._execute(
+            "INSERT INTO job_state (namespace, job_id, value, updated_at)"
+            " VALUES (:namespace, :job_id, :value, :updated_at)"
+            " ON CONFLICT (namespace, job_id) DO UPDATE SET value = excluded.value, updated_at = excluded.updated_at",
+            namespace=namespace, job_id=job_id,
+            value=json.dumps(value, ensure_ascii=False), updated_at=time.time()
+        )
+
+    def delete(self, namespace, job_id):
+        result = self._execute(
+            "DELETE FROM job_state WHERE namespace = :namespace AND job_id = :job_id",
+            namespace=namespace, job_id=job_id
+        )
+        return result.rowcount > 0
+
+    def contains(self, namespace, job_id):
+        return self._execute(
+            "SELECT 1 FROM job_state WHERE namespace = :namespace AND job_id = :job_id",
+            namespace=namespace, job_id=job_id
+        ).fetchone() is not None
+
+    def keys(self, namespace):
+        rows = self._execute(
+            "SELECT job_id FROM job_state WHERE namespace = :namespace", namespace=namespace
+        ).fetchall()
+        return [row[0] for row in rows]
+
+    def items(self, namespace):
+        rows = self._execute(
+            "SELECT job_id, value FROM job_state WHERE namespace = :namespace", namespace=namespace
+        ).fetchall()
+        return [(row[0], json.loads(row[1])) for row in rows]
+
+    def items_since(self, namespace, since):
+        rows = self._execute(
+            "SELECT job_id, value, updated_at FROM job_state"
+            " WHERE namespace = :namespace AND updated_at >= :since",
+            namespace=namespace, since=since
+        ).fetchall()
+        return [(row[0], json.loads(row[1]), row[2]) for row in rows]
+
+    def count(self, namespace):
+        return self._execute(
+            "SELECT COUNT(*) FROM job_state WHERE namespace = :namespace", namespace=namespace
+        ).fetchone()[0]
+
+
+def create_job_store(url):
+    """Build a job store from a URL: memory://, journal:///base_path, sqlite:///path or a SQLAlchemy database URL"""
+    if url == 'memory://':
+        return MemoryJobStore()
+    if url.startswith('journal:///'):
+        return JournaledJobStore(url[len('journal:///'):])
+    if url.startswith('sqlite:///'):
+        return SQLiteJobStore(url[len('sqlite:///'):])
+    return SQLAlchemyJobStore(url)
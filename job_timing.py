@@ -0,0 +1,152 @@
+import os
+import json
+import time
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class JobTimer:
+    """Per-job record of where the time went, fed by JobScheduler's on_state_time
+
+    ``record`` is called each time a job leaves a state; ``timings`` gives
+    the seconds spent per state so far (a state entered twice is summed) and
+    ``finish`` drops the job, returning its spans for export. Jobs only live
+    here while they run in this process; the breakdown is persisted by the
+    caller with the job's own record.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._jobs = {}
+
+    def record(self, job_id, state, seconds):
+        now = time.time()
+        with self._lock:
+            job = self._jobs.setdefault(job_id, {'totals': {}, 'spans': []})
+            job['totals'][state] = job['totals'].get(state, 0.0) + seconds
+            job['spans'].append((state, now - seconds, now))
+
+    def timings(self, job_id):
+        """Seconds spent in each state so far, rounded to the millisecond"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return {}
+            return {state: round(seconds, 3) for state, seconds in job['totals'].items()}
+
+    def finish(self, job_id):
+        """Forget a finished job; returns its [(state, start, end)] spans in wall-clock seconds"""
+        with self._lock:
+            job = self._jobs.pop(job_id, None)
+        return job['spans'] if job else []
+
+
+def format_server_timing(timings):
+    """Server-Timing header value from [(name, seconds, description)]"""
+    entries = []
+    for name, seconds, description in timings:
+        entry = f"{name};dur={seconds * 1000:.1f}"
+        if description:
+            entry += f';desc="{description}"'
+        entries.append(entry)
+    return ', '.join(entries)
+
+
+class JsonLinesSpanExporter:
+    """Appends finished jobs to a file as Zipkin v2 JSON spans, one span per line
+
+    Each job becomes a trace: a root span covering the whole job and a child
+    span for every state it went through. Lines can be batched into a JSON
+    array and POSTed to a Zipkin-compatible collector (/api/v2/spans). Once
+    the file reaches ``max_bytes`` it is renamed to ``<path>.1`` (replacing
+    the previous one) and a new file is started.
+    """
+
+    def __init__(self, path, service_name, max_bytes=None):
+        self.path = path
+        self.service_name = service_name
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+    def _rotate(self):
+        # Called with self._lock held; several workers may append to (and rotate) the same file
+        try:
+            if os.path.getsize(self.path) >= self.max_bytes:
+                os.replace(self.path, f"{self.path}.1")
+        except FileNotFoundError:
+            pass
+
+    def export(self, name, job_id, spans, tags=None):
+        if not spans:
+            return
+        trace_id = os.urandom(16).hex()
+        root_id = os.urandom(8).hex()
+        endpoint = {'serviceName': self.service_name}
+        start = min(span[1] for span in spans)
+        end = max(span[2] for span in spans)
+
+        records = [{
+            'traceId': trace_id, 'id': root_id, 'name': name,
+            'timestamp': int(start * 1e6), 'duration': max(1, int((end - start) * 1e6)),
+            'localEndpoint': endpoint, 'tags': {'job.id': job_id, **(tags or {})},
+        }]
+        for state, span_start, span_end in spans:
+            records.append({
+                'traceId': trace_id, 'parentId': root_id, 'id': os.urandom(8).hex(), 'name': state,
+                'timestamp': int(span_start * 1e6), 'duration': max(1, int((span_end - span_start) * 1e6)),
+                'localEndpoint': endpoint,
+            })
+
+        with self._lock:
+            if os.path.dirname(self.path):
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            if self.max_bytes:
+                self._rotate()
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(''.join(json.dumps(record) + '\n' for record in records))
+
+
+class OpenTelemetrySpanExporter:
+    """Reports finished jobs through the OpenTelemetry API (requires opentelemetry-api)
+
+    Spans go to whatever tracer provider the process configured, e.g. with
+    opentelemetry-instrument; without one the API is a no-op.
+    """
+
+    def __init__(self, service_name):
+        from opentelemetry import trace
+
+        self._trace = trace
+        self._tracer = trace.get_tracer(service_name)
+
+    def export(self, name, job_id, spans, tags=None):
+        if not spans:
+            return
+        start = min(span[1] for span in spans)
+        end = max(span[2] for span in spans)
+        root = self._tracer.start_span(
+            name, start_time=int(start * 1e9), attributes={'job.id': job_id, **(tags or {})}
+        )
+        context = self._trace.set_span_in_context(root)
+        for state, span_start, span_end in spans:
+            self._tracer.start_span(state, context=context, start_time=int(span_start * 1e9)).end(
+                end_time=int(span_end * 1e9)
+            )
+        root.end(end_time=int(end * 1e9))
+
+
+def create_span_exporter(kind, path, service_name, max_bytes=None):
+    """Exporter for TRACE_EXPORT ('', 'jsonl' or 'opentelemetry'); None when tracing is off"""
+    if not kind:
+        return None
+    if kind == 'jsonl':
+        return JsonLinesSpanExporter(path, service_name, max_bytes)
+    if kind == 'opentelemetry':
+        try:
+            return OpenTelemetrySpanExporter(service_name)
+        except ImportError:
+            logger.warning("TRACE_EXPORT=opentelemetry but opentelemetry-api isn't installed; not exporting spans")
+            return None
+    raise ValueError(f"Unsupported TRACE_EXPORT: {kind}")
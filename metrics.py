@@ -0,0 +1,230 @@
+import math
+import os
+import threading
+import time
+import logging
+from bisect import bisect_left
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Seconds; covers everything from a cache hit to a long upload
+DEFAULT_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800)
+
+
+class Metric:
+    """A named family of samples, one per combination of label values"""
+
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def _key(self, labels):
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f"{self.name} takes labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def samples(self):
+        """[(label values, value)], a copy safe to keep"""
+        with self._lock:
+            return [(key, self._copy(value)) for key, value in self._values.items()]
+
+    @staticmethod
+    def _copy(value):
+        return value
+
+    @staticmethod
+    def merge(value, other):
+        return value + other
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    kind = 'gauge'
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram(Metric):
+    """Observations counted into fixed buckets; a value is [count per bucket..., +Inf count, sum]"""
+
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            state[index] += 1
+            state[-1] += value
+
+    @staticmethod
+    def _copy(value):
+        return list(value)
+
+    @staticmethod
+    def merge(value, other):
+        return [a + b for a, b in zip(value, other)]
+
+
+def _format_value(value):
+    if value == math.inf:
+        return '+Inf'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+def _escape(value):
+    return value.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(labelnames, values, extra=()):
+    pairs = list(zip(labelnames, values)) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(str(value))}"' for name, value in pairs) + '}'
+
+
+class MetricsRegistry:
+    """Process-local metrics that can be merged across worker processes.
+
+    Every worker records into its own registry and periodically publishes a
+    ``snapshot`` somewhere shared (e.g. the job store); ``render`` sums the
+    snapshots of all workers into one Prometheus text exposition, so a
+    scrape reports the whole deployment whichever worker answers it.
+    Collectors add gauges computed at scrape time from shared state, which
+    are reported as-is rather than summed.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics = {}
+        self._collectors = []
+
+    def _register(self, metric):
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric already registered: {metric.name}")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def add_collector(self, collector):
+        """Register a callable returning metrics (e.g. fresh Gauges) to include in every render"""
+        self._collectors.append(collector)
+        return collector
+
+    def snapshot(self):
+        """JSON-serializable copy of every metric's samples"""
+        return {
+            name: [[list(key), value] for key, value in metric.samples()]
+            for name, metric in self._metrics.items()
+        }
+
+    def merge(self, snapshots, include_gauges=True):
+        """Sum snapshots sample by sample into one snapshot, leaving out unknown metrics"""
+        merged = {}
+        for snapshot in snapshots:
+            for name, samples in snapshot.items():
+                metric = self._metrics.get(name)
+                if metric is None or (metric.kind == 'gauge' and not include_gauges):
+                    continue
+                values = merged.setdefault(name, {})
+                for key, value in samples:
+                    key = tuple(key)
+                    values[key] = metric.merge(values[key], value) if key in values else value
+        return {name: [[list(key), value] for key, value in values.items()] for name, values in merged.items()}
+
+    def render(self, snapshots=(), stale_snapshots=()):
+        """Prometheus text format for the sum of snapshots plus the collectors' metrics
+
+        Gauges are only taken from ``snapshots``; ``stale_snapshots`` (from
+        processes that stopped publishing) still contribute their counters
+        and histograms so totals never go backwards.
+        """
+        merged = self.merge([self.merge(snapshots), self.merge(stale_snapshots, include_gauges=False)])
+
+        lines = []
+        for name, metric in self._metrics.items():
+            lines.extend(self._format(metric, [(tuple(key), value) for key, value in merged.get(name, [])]))
+        for collector in self._collectors:
+            try:
+                for metric in collector():
+                    lines.extend(self._format(metric, metric.samples()))
+            except Exception as e:
+                logger.error(f"Error collecting metrics: {str(e)}")
+        return '\n'.join(lines) + '\n'
+
+    @staticmethod
+    def _format(metric, samples):
+        lines = [f"# HELP {metric.name} {metric.documentation}", f"# TYPE {metric.name} {metric.kind}"]
+        for key, value in sorted(samples):
+            if metric.kind != 'histogram':
+                lines.append(f"{metric.name}{_format_labels(metric.labelnames, key)} {_format_value(value)}")
+                continue
+            cumulative = 0
+            for bound, count in zip(metric.buckets + (math.inf,), value[:-1]):
+                cumulative += count
+                labels = _format_labels(metric.labelnames, key, [('le', _format_value(float(bound)))])
+                lines.append(f"{metric.name}_bucket{labels} {cumulative}")
+            lines.append(f"{metric.name}_sum{_format_labels(metric.labelnames, key)} {_format_value(value[-1])}")
+            lines.append(f"{metric.name}_count{_format_labels(metric.labelnames, key)} {cumulative}")
+        return lines
+
+
+class SnapshotPublisher:
+    """Background thread that calls ``publish`` on start and then every ``interval`` seconds"""
+
+    def __init__(self, interval, publish):
+        self.interval = interval
+        self.publish = publish
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def start(self):
+        """Start publishing (idempotent, and restarts the thread in a forked child)"""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name=f'metrics-publisher-{os.getpid()}', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            try:
+                self.publish()
+            except Exception as e:
+                logger.error(f"Error publishing metrics: {str(e)}")
+            time.sleep(self.interval)
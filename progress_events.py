@@ -0,0 +1,48 @@
+import threading
+
+
+class ProgressNotifier:
+    """Wakes up listeners waiting for progress changes on a given job.
+
+    Producers (yt-dlp progress hooks, job completion) call ``notify`` and
+    consumers such as the SSE stream block in ``wait`` until the job's
+    version counter moves. Each job has its own condition so a busy download
+    only wakes the streams that are watching it.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._conditions = {}
+        self._versions = {}
+
+    def _condition(self, key):
+        # Called with self._lock held
+        condition = self._conditions.get(key)
+        if condition is None:
+            condition = self._conditions[key] = threading.Condition(self._lock)
+        return condition
+
+    def notify(self, key):
+        """Signal that the state of a job changed"""
+        with self._lock:
+            self._versions[key] = self._versions.get(key, 0) + 1
+            self._condition(key).notify_all()
+
+    def version(self, key):
+        """Current change counter for a job"""
+        with self._lock:
+            return self._versions.get(key, 0)
+
+    def wait(self, key, last_version, timeout):
+        """Block until the job changes past last_version or timeout elapses; returns the new version"""
+        with self._lock:
+            self._condition(key).wait_for(lambda: self._versions.get(key, 0) != last_version, timeout)
+            return self._versions.get(key, 0)
+
+    def forget(self, key):
+        """Drop the bookkeeping for a job, waking anyone still waiting on it"""
+        with self._lock:
+            condition = self._conditions.pop(key, None)
+            self._versions.pop(key, None)
+            if condition is not None:
+                condition.notify_all()
@@ -0,0 +1,54 @@
+import os
+import logging
+import threading
+
+try:
+    import fcntl
+except ImportError:  # Windows: every process acts alone
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+
+class ServiceLock:
+    """Elects one process per host to run shared background services.
+
+    The first process to take the non-blocking file lock holds it for the
+    rest of its life; the others keep calling ``acquire`` (cheap) and take
+    over automatically once the holder exits, since the OS drops the lock
+    with the process.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._file = None
+        self._pid = None
+
+    @property
+    def held(self):
+        # A forked child inherits the open file but is not the process that was elected
+        return self._file is not None and self._pid == os.getpid()
+
+    def acquire(self):
+        """Try to become the service process; returns whether this process holds the lock"""
+        with self._lock:
+            if self.held:
+                return True
+            if fcntl is None:
+                self._file, self._pid = True, os.getpid()
+                return True
+
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            lock_file = open(self.path, 'a')
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                lock_file.close()
+                return False
+
+            self._file, self._pid = lock_file, os.getpid()
+            logger.debug(f"Process {os.getpid()} now runs the shared background services")
+            return True
@@ -11,10 +11,12 @@ document.addEventListener('DOMContentLoaded', function() {
     const downloadErrorSection = document.getElementById('download-error-section');
     const errorMessage = document.getElementById('error-message');
     const downloadFileButton = document.getElementById('download-file-button');
+    const downloadOriginalButton = document.getElementById('download-original-button');
     const tryAgainButton = document.getElementById('try-again-button');
     const instructionsCard = document.getElementById('instructions-card');
     const downloadTitle = document.getElementById('download-title');
     const downloadNewButton = document.getElementById('download-new-button');
+    const videoInfo = document.getElementById('video-info');
     
     // Transcription elements
     const transcribeButton = document.getElementById('transcribe-button');
@@ -29,11 +31,15 @@ document.addEventListener('DOMContentLoaded', function() {
     const transcriptionPreview = document.getElementById('transcription-preview');
     const downloadSrtButton = document.getElementById('download-srt-button');
     const downloadTxtButton = document.getElementById('download-txt-button');
+    const downloadVttButton = document.getElementById('download-vtt-button');
     const saveApiKeyButton = document.getElementById('save-api-key');
 
     // Current download ID
     let currentDownloadId = null;
     let progressInterval = null;
+    let progressStream = null;
+    let infoTimeout = null;
+    let prefetchedUrl = null;
 
     // Form submission handler
     downloadForm.addEventListener('submit', function(e) {
@@ -52,6 +58,50 @@ document.addEventListener('DOMContentLoaded', function() {
         startDownload(youtubeUrl);
     });
 
+    // Prefetch the video's metadata as soon as a URL is pasted or typed, so the server
+    // has it cached (and the user sees the title) before Download is pressed
+    youtubeUrlInput.addEventListener('input', function() {
+        clearTimeout(infoTimeout);
+        infoTimeout = setTimeout(prefetchVideoInfo, 400);
+    });
+    
+    // Function to fetch and show a video's title and duration
+    function prefetchVideoInfo() {
+        const youtubeUrl = youtubeUrlInput.value.trim();
+        if (!isValidYoutubeUrl(youtubeUrl) || youtubeUrl === prefetchedUrl) {
+            return;
+        }
+        prefetchedUrl = youtubeUrl;
+        
+        fetch(`/info?url=${encodeURIComponent(youtubeUrl)}`)
+            .then(response => response.json())
+            .then(data => {
+                // Ignore answers for a URL that has since been replaced
+                if (youtubeUrlInput.value.trim() !== youtubeUrl) {
+                    return;
+                }
+                if (data.status === 'success' && data.title) {
+                    videoInfo.textContent = data.duration ? `${data.title} (${formatDuration(data.duration)})` : data.title;
+                    videoInfo.classList.remove('d-none');
+                } else {
+                    videoInfo.classList.add('d-none');
+                }
+            })
+            .catch(error => {
+                // Only a hint; the download itself will report real errors
+                console.warn('Could not prefetch video info:', error);
+                prefetchedUrl = null;
+            });
+    }
+    
+    // Function to format seconds as H:MM:SS or M:SS
+    function formatDuration(totalSeconds) {
+        const hours = Math.floor(totalSeconds / 3600);
+        const minutes = Math.floor((totalSeconds % 3600) / 60);
+        const seconds = Math.floor(totalSeconds % 60).toString().padStart(2, '0');
+        return hours ? `${hours}:${minutes.toString().padStart(2, '0')}:${seconds}` : `${minutes}:${seconds}`;
+    }
+
     // Try again button handler
     tryAgainButton.addEventListener('click', function() {
         resetUI();
@@ -112,6 +162,34 @@ document.addEventListener('DOMContentLoaded', function() {
 
     // Function to track download progress
     function startProgressTracking(downloadId) {
+        stopProgressTracking();
+        
+        // Prefer server-pushed updates; fall back to polling if EventSource is unavailable or fails
+        if (!window.EventSource) {
+            startProgressPolling(downloadId);
+            return;
+        }
+        
+        progressStream = new EventSource(`/progress/${downloadId}/stream`);
+        
+        progressStream.onmessage = function(event) {
+            handleProgressUpdate(downloadId, JSON.parse(event.data));
+        };
+        
+        progressStream.onerror = function() {
+            // The server closes long-lived streams periodically and EventSource reconnects on its own;
+            // only give up on streaming if the connection is definitively closed (including a 503
+            // when the server has no stream slots left)
+            if (progressStream && progressStream.readyState === EventSource.CLOSED) {
+                console.warn('Progress stream closed, falling back to polling');
+                progressStream = null;
+                startProgressPolling(downloadId);
+            }
+        };
+    }
+    
+    // Function to poll download progress (fallback when streaming is not available)
+    function startProgressPolling(downloadId) {
         // Clear any existing interval
         if (progressInterval) {
             clearInterval(progressInterval);
@@ -121,35 +199,54 @@ document.addEventListener('DOMContentLoaded', function() {
         progressInterval = setInterval(() => {
             fetch(`/progress/${downloadId}`)
                 .then(response => response.json())
-                .then(data => {
-                    // Update progress bar
-                    const progress = Math.round(data.progress);
-                    progressBar.style.width = `${progress}%`;
-                    progressPercentage.textContent = `${progress}%`;
-                    
-                    // Update status message
-                    if (data.status === 'downloading') {
-                        statusText.textContent = 'Downloading and processing audio...';
-                    }
-                    
-                    // Check if download is finished
-                    if (data.finished) {
-                        clearInterval(progressInterval);
-                        
-                        if (data.status === 'success') {
-                            downloadComplete(downloadId, data.title);
-                        } else {
-                            showError(data.message || 'Download failed');
-                        }
-                    }
-                })
+                .then(data => handleProgressUpdate(downloadId, data))
                 .catch(error => {
                     console.error('Error tracking progress:', error);
-                    clearInterval(progressInterval);
+                    stopProgressTracking();
                     showError('Error tracking progress, please try again');
                 });
         }, 1000);
     }
+    
+    // Function to stop any active progress stream or polling interval
+    function stopProgressTracking() {
+        if (progressStream) {
+            progressStream.close();
+            progressStream = null;
+        }
+        if (progressInterval) {
+            clearInterval(progressInterval);
+            progressInterval = null;
+        }
+    }
+    
+    // Function to apply a progress report to the UI
+    function handleProgressUpdate(downloadId, data) {
+        // Update progress bar
+        const progress = Math.round(data.progress);
+        progressBar.style.width = `${progress}%`;
+        progressPercentage.textContent = `${progress}%`;
+        
+        // Update status message
+        if (data.status === 'downloading') {
+            if (data.state === 'queued' && data.queue_position) {
+                statusText.textContent = `Waiting in queue (position ${data.queue_position})...`;
+            } else {
+                statusText.textContent = 'Downloading and processing audio...';
+            }
+        }
+        
+        // Check if download is finished
+        if (data.finished) {
+            stopProgressTracking();
+            
+            if (data.status === 'success') {
+                downloadComplete(downloadId, data.title);
+            } else {
+                showError(data.message || 'Download failed');
+            }
+        }
+    }
 
     // Function to handle download completion
     function downloadComplete(downloadId, title) {
@@ -164,16 +261,78 @@ document.addEventListener('DOMContentLoaded', function() {
             downloadTitle.textContent = `"${title}" is ready for download`;
         }
         
-        // Set up download button
+        // Set up download button (the MP3 is encoded in the background, then downloaded)
         downloadFileButton.onclick = function() {
+            convertToMp3(downloadId);
+        };
+        
+        // Set up original audio button (served as downloaded, no re-encode)
+        if (downloadOriginalButton) {
+            downloadOriginalButton.onclick = function() {
+                window.location.href = `/get_file/${downloadId}`;
+                
+                // Cleanup after 2 seconds
+                setTimeout(() => {
+                    cleanupDownload(downloadId);
+                }, 2000);
+            };
+        }
+    }
+
+    // Function to encode the MP3, following its progress, and download it once ready
+    function convertToMp3(downloadId) {
+        const buttonHtml = downloadFileButton.innerHTML;
+        downloadFileButton.disabled = true;
+        downloadFileButton.innerHTML = '<i class="fa fa-spinner fa-spin me-2"></i>Converting...';
+        
+        function finish(error) {
+            downloadFileButton.disabled = false;
+            downloadFileButton.innerHTML = buttonHtml;
+            if (error) {
+                statusText.textContent = error;
+                return;
+            }
             // Redirect to download URL
-            window.location.href = `/get_file/${downloadId}`;
+            window.location.href = `/get_file/${downloadId}?format=mp3`;
             
             // Cleanup after 2 seconds
             setTimeout(() => {
                 cleanupDownload(downloadId);
             }, 2000);
-        };
+        }
+        
+        function poll() {
+            fetch(`/conversion_progress/${downloadId}`)
+                .then(response => response.json())
+                .then(data => {
+                    if (data.finished) {
+                        finish(data.status === 'success' ? null : (data.message || 'Could not convert the audio to MP3'));
+                        return;
+                    }
+                    downloadFileButton.innerHTML = `<i class="fa fa-spinner fa-spin me-2"></i>Converting ${Math.round(data.progress || 0)}%`;
+                    setTimeout(poll, 1000);
+                })
+                .catch(error => {
+                    console.error('Error tracking conversion:', error);
+                    finish('Error tracking the MP3 conversion, please try again');
+                });
+        }
+        
+        fetch(`/convert/${downloadId}`, { method: 'POST' })
+            .then(response => response.json())
+            .then(data => {
+                if (data.status === 'error') {
+                    finish(data.message || 'Could not convert the audio to MP3');
+                } else if (data.finished) {
+                    finish(null);
+                } else {
+                    poll();
+                }
+            })
+            .catch(error => {
+                console.error('Error starting conversion:', error);
+                finish('Error starting the MP3 conversion, please try again');
+            });
     }
 
     // Function to show error message
@@ -186,10 +345,8 @@ document.addEventListener('DOMContentLoaded', function() {
         downloadButton.disabled = false;
         downloadButton.innerHTML = '<i class="fa fa-download me-2"></i>Download Audio';
         
-        // Clear interval if it exists
-        if (progressInterval) {
-            clearInterval(progressInterval);
-        }
+        // Stop any active progress tracking
+        stopProgressTracking();
     }
 
     // Function to reset UI
@@ -204,6 +361,8 @@ document.addEventListener('DOMContentLoaded', function() {
         
         // Clear the YouTube URL input field
         youtubeUrlInput.value = '';
+        videoInfo.classList.add('d-none');
+        prefetchedUrl = null;
         
         // Clean up if there was a download
         if (currentDownloadId) {
@@ -211,10 +370,8 @@ document.addEventListener('DOMContentLoaded', function() {
             currentDownloadId = null;
         }
         
-        // Clear interval if it exists
-        if (progressInterval) {
-            clearInterval(progressInterval);
-        }
+        // Stop any active progress tracking
+        stopProgressTracking();
     }
 
     // Function to cleanup download
@@ -285,6 +442,58 @@ document.addEventListener('DOMContentLoaded', function() {
         });
     }
     
+    // Function to poll a transcription job until it succeeds or fails
+    function pollTranscription(jobId, downloadId) {
+        fetch(`/transcription_progress/${jobId}`)
+            .then(response => response.json())
+            .then(data => {
+                if (data.status === 'success' || data.status === 'error') {
+                    finishTranscription(data, downloadId);
+                } else {
+                    setTimeout(() => pollTranscription(jobId, downloadId), 2000);
+                }
+            })
+            .catch(error => {
+                console.error('Error tracking transcription:', error);
+                transcribeModal.hide();
+                startTranscriptionButton.disabled = false;
+                transcriptionStatus.classList.add('d-none');
+                alert('Error communicating with the server. Please try again.');
+            });
+    }
+    
+    // Function to show the outcome of a transcription job
+    function finishTranscription(data, downloadId) {
+        // Hide the transcription modal
+        transcribeModal.hide();
+        startTranscriptionButton.disabled = false;
+        transcriptionStatus.classList.add('d-none');
+        
+        if (data.status === 'success') {
+            // Show results modal
+            transcriptionPreview.textContent = data.plain_text || data.text || 'Transcription completed successfully';
+            transcriptionResultsModal.show();
+            
+            // Versioned links let the browser reuse a transcript it already downloaded
+            const versionQuery = data.transcript_version ? `?v=${data.transcript_version}` : '';
+            
+            // Set up download buttons
+            downloadSrtButton.onclick = function() {
+                window.location.href = `/get_srt/${downloadId}${versionQuery}`;
+            };
+            
+            downloadTxtButton.onclick = function() {
+                window.location.href = `/get_txt/${downloadId}${versionQuery}`;
+            };
+            
+            downloadVttButton.onclick = function() {
+                window.location.href = `/get_vtt/${downloadId}${versionQuery}`;
+            };
+        } else {
+            alert(`Transcription failed: ${data.message || 'Unknown error'}`);
+        }
+    }
+    
     if (startTranscriptionButton) {
         startTranscriptionButton.addEventListener('click', function() {
             const apiKey = elevenlabsApiKey.value.trim();
@@ -307,34 +516,18 @@ document.addEventListener('DOMContentLoaded', function() {
             formData.append('diarize', diarizeOption.checked);
             formData.append('tag_events', tagEventsOption.checked);
             
-            // Make API request
+            // Start the transcription job, then poll it until it finishes
             fetch(`/transcribe/${currentDownloadId}`, {
                 method: 'POST',
                 body: formData
             })
             .then(response => response.json())
             .then(data => {
-                // Hide the transcription modal
-                transcribeModal.hide();
-                startTranscriptionButton.disabled = false;
-                transcriptionStatus.classList.add('d-none');
-                
-                if (data.status === 'success') {
-                    // Show results modal
-                    transcriptionPreview.textContent = data.plain_text || data.text || 'Transcription completed successfully';
-                    transcriptionResultsModal.show();
-                    
-                    // Set up download buttons
-                    downloadSrtButton.onclick = function() {
-                        window.location.href = `/get_srt/${currentDownloadId}`;
-                    };
-                    
-                    downloadTxtButton.onclick = function() {
-                        window.location.href = `/get_txt/${currentDownloadId}`;
-                    };
-                } else {
-                    alert(`Transcription failed: ${data.message || 'Unknown error'}`);
+                if (data.status !== 'started') {
+                    finishTranscription(data);
+                    return;
                 }
+                pollTranscription(data.job_id, currentDownloadId);
             })
             .catch(error => {
                 console.error('Error during transcription:', error);
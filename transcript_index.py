@@ -0,0 +1,66 @@
+import re
+from bisect import bisect_left, bisect_right
+
+from transcript_render import iter_segments, join_words
+
+TIMESTAMP_RE = re.compile(r'^(?:(\d+):)?(?:(\d+):)?(\d+(?:\.\d+)?)$')
+
+# Rough per-word memory footprint, used to bound caches of indexes
+WORD_INDEX_BYTES = 200
+
+
+def parse_timestamp(value):
+    """Seconds from '754.5', '12:34.5' or '1:02:34.5'; raises ValueError otherwise"""
+    match = TIMESTAMP_RE.match(value.strip())
+    if not match:
+        raise ValueError(f"Invalid timestamp: {value}")
+    first, second, seconds = match.groups()
+    if second is None:
+        hours, minutes = 0, int(first or 0)
+    else:
+        hours, minutes = int(first), int(second)
+    return hours * 3600 + minutes * 60 + float(seconds)
+
+
+class TranscriptIndex:
+    """Words and cues of one transcript, sorted by start time for range queries
+
+    Built once per transcript (and segmentation); every query is two binary
+    searches plus a slice, so asking for a few minutes of a long transcript
+    never touches the rest of it.
+    """
+
+    def __init__(self, transcription_data, **segmentation):
+        words = [
+            {key: word[key] for key in ('text', 'start', 'end', 'speaker_id') if key in word}
+            for word in transcription_data.get('words', [])
+            if word.get('type') == 'word' and word.get('start') is not None
+        ]
+        # Chunked transcriptions are merged in order, but don't rely on it
+        words.sort(key=lambda word: word['start'])
+        self.words = words
+        self.word_starts = [word['start'] for word in words]
+
+        self.cues = [
+            {'start': start, 'end': end, 'text': text, 'speaker': speaker}
+            for start, end, text, speaker in iter_segments(transcription_data, **segmentation)
+        ]
+        self.cue_starts = [cue['start'] for cue in self.cues]
+        self.language = transcription_data.get('language_code', 'en')
+
+    def size_estimate(self):
+        return (len(self.words) + len(self.cues)) * WORD_INDEX_BYTES
+
+    def words_between(self, start, end):
+        """Words that start within [start, end)"""
+        return self.words[bisect_left(self.word_starts, start):bisect_left(self.word_starts, end)]
+
+    def cues_between(self, start, end):
+        """Cues that overlap [start, end), including one already running at ``start``"""
+        first = bisect_right(self.cue_starts, start) - 1
+        if first < 0 or self.cues[first]['end'] <= start:
+            first += 1
+        return self.cues[first:bisect_left(self.cue_starts, end)]
+
+    def text_between(self, start, end):
+        return join_words(self.words_between(start, end))
@@ -0,0 +1,184 @@
+import io
+import json
+import threading
+from collections import OrderedDict
+
+# Words starting with one of these attach to the previous word without a space
+NO_SPACE_BEFORE = (' ', '.', ',', '!', '?', ':', ';')
+
+FORMATS = ('srt', 'vtt', 'txt', 'json')
+
+# Segmentation used when a request doesn't ask for anything else
+DEFAULT_SEGMENTATION = {
+    'words_per_cue': 10,
+    'max_chars': None,
+    'max_duration': None,
+    'speaker_labels': False,
+}
+
+
+def format_timestamp(seconds, separator=','):
+    """Format seconds as HH:MM:SS<separator>mmm (',' for SRT, '.' for WebVTT)"""
+    # Same rounding as timedelta: to the microsecond, then truncated to milliseconds
+    milliseconds = int(round(seconds * 1000000)) // 1000
+    hours, milliseconds = divmod(milliseconds, 3600000)
+    minutes, milliseconds = divmod(milliseconds, 60000)
+    seconds, milliseconds = divmod(milliseconds, 1000)
+    return f"{hours % 24:02}:{minutes:02}:{seconds:02}{separator}{milliseconds:03}"
+
+
+def iter_segments(transcription_data, words_per_cue=10, max_chars=None, max_duration=None,
+                  speaker_labels=False):
+    """Yield (start, end, text, speaker) cues in one pass over the word list
+
+    A cue ends after ``words_per_cue`` words, before a word that would make
+    its text longer than ``max_chars`` or make it last longer than
+    ``max_duration`` seconds, and, with ``speaker_labels``, whenever the
+    speaker changes. A single word is never split.
+    """
+    group = []
+    length = 0
+    for word in transcription_data.get('words', []):
+        if word.get('type') != 'word':
+            continue
+
+        if group:
+            word_length = len(word.get('text', '')) + 1
+            if (max_chars is not None and length + word_length > max_chars) or \
+                    (max_duration is not None and
+                     word.get('end', word.get('start', 0)) - group[0].get('start', 0) > max_duration) or \
+                    (speaker_labels and word.get('speaker_id') != group[0].get('speaker_id')):
+                yield _segment(group)
+                group = []
+                length = 0
+
+        length += len(word.get('text', '')) + (1 if group else 0)
+        group.append(word)
+        if len(group) == words_per_cue:
+            yield _segment(group)
+            group = []
+            length = 0
+    if group:
+        yield _segment(group)
+
+
+def join_words(words):
+    """Text of a run of words, spaced except before punctuation"""
+    if not words:
+        return ''
+    text_parts = [words[0].get('text', '')]
+    for word in words[1:]:
+        word_text = word.get('text', '')
+        # Add space before this word if it doesn't start with punctuation
+        if not word_text.startswith(NO_SPACE_BEFORE):
+            text_parts.append(' ')
+        text_parts.append(word_text)
+    return ''.join(text_parts).strip()
+
+
+def _segment(group):
+    start = group[0].get('start', 0)
+    end = group[-1].get('end', start + 2)  # Default to 2 seconds after start if no end time
+    return start, end, join_words(group), group[0].get('speaker_id')
+
+
+def render_transcript(transcription_data, outputs, **segmentation):
+    """Write every requested format in a single walk over the words
+
+    ``outputs`` maps a format name from FORMATS to a writable text stream;
+    each cue is written to every stream as soon as it is built, so nothing
+    is accumulated by string concatenation. ``segmentation`` is passed on
+    to ``iter_segments``.
+    """
+    speaker_labels = segmentation.get('speaker_labels', False)
+    srt = outputs.get('srt')
+    vtt = outputs.get('vtt')
+    txt = outputs.get('txt')
+    segments_json = outputs.get('json')
+
+    if vtt is not None:
+        vtt.write("WEBVTT\n\n")
+    if segments_json is not None:
+        language = json.dumps(transcription_data.get('language_code', 'en'))
+        segments_json.write(f'{{"language": {language}, "segments": [')
+
+    count = 0
+    for start, end, text, speaker in iter_segments(transcription_data, **segmentation):
+        count += 1
+        labelled = f"[{speaker}] {text}" if speaker_labels and speaker else text
+        if srt is not None:
+            srt.write(f"{count}\n{format_timestamp(start)} --> {format_timestamp(end)}\n{labelled}\n\n")
+        if vtt is not None:
+            # WebVTT has its own voice tag for speakers
+            cue_text = f"<v {speaker}>{text}" if speaker_labels and speaker else text
+            vtt.write(f"{format_timestamp(start, '.')} --> {format_timestamp(end, '.')}\n{cue_text}\n\n")
+        if txt is not None:
+            # Paragraphs are separated by a blank line, with none after the last
+            txt.write(f"\n\n{labelled}" if count > 1 else labelled)
+        if segments_json is not None:
+            segment = {'start': start, 'end': end, 'text': text}
+            if speaker is not None:
+                segment['speaker'] = speaker
+            segments_json.write((', ' if count > 1 else '') + json.dumps(segment, ensure_ascii=False))
+
+    if segments_json is not None:
+        segments_json.write("]}")
+    return count
+
+
+def render_transcript_strings(transcription_data, formats=FORMATS, **segmentation):
+    """Render the given formats in memory; returns {format: content}"""
+    streams = {fmt: io.StringIO() for fmt in formats}
+    render_transcript(transcription_data, streams, **segmentation)
+    return {fmt: stream.getvalue() for fmt, stream in streams.items()}
+
+
+class RenderCache:
+    """Small thread-safe LRU cache of rendered transcripts, bounded by entries and bytes
+
+    Sizes are measured with ``sizeof`` (``len`` of the rendered bytes by default).
+
+    Keys are chosen by the caller and must change whenever the transcript
+    does (e.g. include its version), so entries never need invalidating;
+    ``forget`` just frees memory early for a removed download.
+    """
+
+    def __init__(self, max_entries=64, max_bytes=32 * 1024 * 1024, sizeof=len):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._size = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        size = self.sizeof(value)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._size -= self.sizeof(previous)
+            self._entries[key] = value
+            self._size += size
+            while len(self._entries) > self.max_entries or self._size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= self.sizeof(evicted)
+
+    def forget(self, owner):
+        """Drop every entry whose key tuple starts with ``owner``"""
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == owner]:
+                self._size -= self.sizeof(self._entries.pop(key))
@@ -0,0 +1,135 @@
+import re
+import threading
+from array import array
+
+TERM_RE = re.compile(r"\w+(?:'\w+)*")
+
+
+def terms_of(text):
+    """Normalized search terms in a piece of text"""
+    return [term.lower() for term in TERM_RE.findall(text)]
+
+
+class TranscriptSearchIndex:
+    """In-memory inverted index over the words of every transcript.
+
+    Postings map a term to, per download, the positions of the words that
+    contain it; word start/end times are kept per download in compact
+    arrays so hits come back with timestamps without reloading anything.
+    Transcripts are added and removed one at a time, so the index is kept
+    up to date incrementally instead of being rebuilt.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._postings = {}
+        self._documents = {}
+
+    def __contains__(self, download_id):
+        return download_id in self._documents
+
+    def __len__(self):
+        return len(self._documents)
+
+    def download_ids(self):
+        with self._lock:
+            return list(self._documents)
+
+    def version(self, download_id):
+        """Version of the transcript indexed for a download, or None"""
+        document = self._documents.get(download_id)
+        return document['version'] if document else None
+
+    def add(self, download_id, transcription_data, version=None):
+        """Index (or re-index) one transcript"""
+        words = []
+        starts = array('d')
+        ends = array('d')
+        postings = {}
+
+        for word in transcription_data.get('words', []):
+            if word.get('type') != 'word':
+                continue
+            position = len(words)
+            text = word.get('text', '')
+            words.append(text)
+            start = word.get('start') or 0.0
+            starts.append(start)
+            ends.append(word.get('end') or start)
+            for term in terms_of(text):
+                postings.setdefault(term, array('I')).append(position)
+
+        with self._lock:
+            self._remove(download_id)
+            self._documents[download_id] = {
+                'version': version, 'words': words, 'starts': starts, 'ends': ends, 'terms': list(postings)
+            }
+            for term, positions in postings.items():
+                self._postings.setdefault(term, {})[download_id] = positions
+
+    def remove(self, download_id):
+        with self._lock:
+            self._remove(download_id)
+
+    def _remove(self, download_id):
+        # Called with self._lock held
+        document = self._documents.pop(download_id, None)
+        if document is None:
+            return
+        for term in document['terms']:
+            by_download = self._postings.get(term)
+            if by_download is None:
+                continue
+            by_download.pop(download_id, None)
+            if not by_download:
+                del self._postings[term]
+
+    def search(self, query, phrase=False, limit=20, max_hits=50):
+        """Downloads containing every query term, most hits first
+
+        Returns a list of {'download_id', 'count', 'hits'} where each hit has
+        the matched text with its start and end time. With ``phrase`` the
+        terms must appear consecutively and a hit spans the whole phrase.
+        """
+        terms = terms_of(query)
+        if not terms:
+            return []
+
+        with self._lock:
+            postings = [self._postings.get(term, {}) for term in terms]
+            # Intersect starting from the rarest term
+            candidates = set(min(postings, key=len))
+            for by_download in postings:
+                candidates &= by_download.keys()
+
+            results = []
+            for download_id in candidates:
+                document = self._documents[download_id]
+                if phrase and len(terms) > 1:
+                    following = [set(by_download[download_id]) for by_download in postings[1:]]
+                    matches = [
+                        (position, position + len(terms) - 1)
+                        for position in postings[0][download_id]
+                        if all(position + offset + 1 in positions for offset, positions in enumerate(following))
+                    ]
+                else:
+                    matches = sorted(
+                        (position, position)
+                        for by_download in postings
+                        for position in by_download[download_id]
+                    )
+                if not matches:
+                    continue
+
+                hits = [
+                    {
+                        'text': ' '.join(document['words'][first:last + 1]),
+                        'start': document['starts'][first],
+                        'end': document['ends'][last],
+                    }
+                    for first, last in matches[:max_hits]
+                ]
+                results.append({'download_id': download_id, 'count': len(matches), 'hits': hits})
+
+        results.sort(key=lambda result: result['count'], reverse=True)
+        return results[:limit]
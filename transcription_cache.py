@@ -0,0 +1,117 @@
+import os
+import json
+import hashlib
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class TranscriptionCache:
+    """Persistent cache of speech-to-text responses.
+
+    Entries are keyed by the SHA-256 of the audio content plus the options
+    that change the API output (model, diarization, audio event tagging), and
+    stored as one JSON file per key so they survive restarts and are shared
+    by every worker process. ``evict_lru`` keeps the entries within
+    ``max_bytes``; reads refresh an entry's mtime so it counts as recently used.
+    """
+
+    def __init__(self, cache_dir, max_bytes=None):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        # (path, size, mtime) -> digest, so the same file is only hashed once
+        self._digests = {}
+
+    def file_digest(self, file_path):
+        """SHA-256 of a file's content, memoized on its size and mtime"""
+        stat = os.stat(file_path)
+        memo_key = (os.path.abspath(file_path), stat.st_size, stat.st_mtime_ns)
+        with self._lock:
+            digest = self._digests.get(memo_key)
+        if digest:
+            return digest
+
+        sha = hashlib.sha256()
+        with open(file_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                sha.update(chunk)
+        digest = sha.hexdigest()
+
+        with self._lock:
+            self._digests[memo_key] = digest
+        return digest
+
+    def make_key(self, file_path, model_id, diarize, tag_audio_events):
+        """Cache key for transcribing a file with the given options"""
+        options = f"{model_id}|diarize={bool(diarize)}|tag_audio_events={bool(tag_audio_events)}"
+        return hashlib.sha256(f"{self.file_digest(file_path)}|{options}".encode('utf-8')).hexdigest()
+
+    def _entry_path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def get(self, key):
+        """Return the cached transcription data for a key, or None on a miss"""
+        entry_path = self._entry_path(key)
+        try:
+            with open(entry_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            os.utime(entry_path)
+            return data
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.error(f"Error reading transcription cache entry {key}: {str(e)}")
+            return None
+
+    def put(self, key, transcription_data):
+        """Store transcription data under a key"""
+        entry_path = self._entry_path(key)
+        tmp_path = f"{entry_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(transcription_data, f, ensure_ascii=False)
+            # Atomic rename so concurrent readers never see a half-written entry
+            os.replace(tmp_path, entry_path)
+        except Exception as e:
+            logger.error(f"Error writing transcription cache entry {key}: {str(e)}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def _entries(self):
+        """[(mtime, size, path)] of every stored entry"""
+        entries = []
+        try:
+            names = os.listdir(self.cache_dir)
+        except FileNotFoundError:
+            return entries
+        for name in names:
+            if not name.endswith('.json'):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
+
+    def evict_lru(self, max_bytes=None):
+        """Delete least recently used entries until the cache fits max_bytes; returns bytes freed"""
+        max_bytes = self.max_bytes if max_bytes is None else max_bytes
+        if max_bytes is None or max_bytes <= 0:
+            return 0
+        entries = sorted(self._entries())
+        over = sum(size for _, size, _ in entries) - max_bytes
+        freed = 0
+        for _, size, path in entries:
+            if freed >= over:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                continue
+            freed += size
+            logger.debug(f"Evicted transcription cache entry: {path}")
+        return freed
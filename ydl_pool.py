@@ -0,0 +1,98 @@
+import logging
+import queue
+import threading
+from contextlib import contextmanager
+
+import yt_dlp
+from yt_dlp.postprocessor import FFmpegExtractAudioPP
+
+logger = logging.getLogger(__name__)
+
+
+class QuietYDLLogger:
+    """yt-dlp logger that only passes errors on to our log"""
+
+    def debug(self, msg):
+        pass
+
+    def warning(self, msg):
+        pass
+
+    def error(self, msg):
+        logger.error(msg)
+
+
+class StageLimitedExtractAudioPP(FFmpegExtractAudioPP):
+    """FFmpegExtractAudio postprocessor that counts against a scheduler's 'postprocess' stage limit"""
+
+    def __init__(self, downloader, scheduler, **kwargs):
+        super().__init__(downloader, **kwargs)
+        self.scheduler = scheduler
+
+    def run(self, information):
+        with self.scheduler.stage(self._downloader.job_id, 'postprocess'):
+            return super().run(information)
+
+
+class PooledYoutubeDL(yt_dlp.YoutubeDL):
+    """YoutubeDL that knows which job it is currently working for
+
+    ``job_id`` is set while the instance is checked out of a pool, so
+    progress hooks and postprocessors can attribute their work without the
+    job ID being smuggled through the info dict.
+    """
+
+    def __init__(self, params, progress_callback=None):
+        super().__init__(params)
+        self.job_id = None
+        if progress_callback is not None:
+            self.add_progress_hook(lambda status: progress_callback(self.job_id, status))
+
+
+class YoutubeDLPool:
+    """Bounded pool of preconfigured, reusable YoutubeDL instances
+
+    Building a YoutubeDL and instantiating its extractors is paid once per
+    instance instead of once per job. Instances are created lazily up to
+    ``size``; an instance is only used by one job at a time. ``setup`` is
+    called on every new instance, e.g. to add postprocessors.
+    """
+
+    def __init__(self, params, size, progress_callback=None, setup=None):
+        self.params = dict(params)
+        self.size = max(1, int(size))
+        self.progress_callback = progress_callback
+        self.setup = setup
+        self._slots = threading.BoundedSemaphore(self.size)
+        self._idle = queue.LifoQueue()
+
+    def _create(self):
+        ydl = PooledYoutubeDL(dict(self.params), self.progress_callback)
+        if self.setup is not None:
+            self.setup(ydl)
+        return ydl
+
+    @contextmanager
+    def job(self, job_id):
+        """Check out an instance working for job_id, returning it to the pool afterwards"""
+        with self._slots:
+            try:
+                ydl = self._idle.get_nowait()
+            except queue.Empty:
+                ydl = self._create()
+
+            ydl.job_id = job_id
+            try:
+                yield ydl
+            except BaseException:
+                # Don't reuse an instance a job failed in; a fresh one is cheap enough
+                ydl.close()
+                raise
+            else:
+                ydl.job_id = None
+                self._idle.put(ydl)
+
+    def warm(self, count=1):
+        """Create up to count idle instances ahead of the first job"""
+        for _ in range(min(count, self.size - self._idle.qsize())):
+            self._idle.put(self._create())